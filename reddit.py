@@ -1,21 +1,38 @@
 import json
 import logging
 import os
+import queue
+import random
 import threading
 import time
 import signal
+from collections import deque
 from contextlib import contextmanager
-from datetime import datetime
-from http.server import BaseHTTPRequestHandler, HTTPServer
+import socket
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Iterable, List, Optional, Dict, Any
 
 import praw
 from dotenv import load_dotenv
 
+try:
+    # Optional: bounded-memory membership filter; falls back to an exact set
+    from pybloom_live import ScalableBloomFilter
+except ImportError:
+    ScalableBloomFilter = None
+
+try:
+    # Optional: much faster JSON decoding for large legacy snapshots
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 from utilities.globals import reddit, SUBREDDIT, SUBREDDIT_RULES
 from utilities.metrics import METRICS
 from utilities.logging_config import setup_logging
-from rules.handle_posts import handle_submission
+from rules.handle_posts import handle_submission, warm_rules
 
 logger = logging.getLogger(__name__)
 
@@ -23,16 +40,16 @@ logger = logging.getLogger(__name__)
 @contextmanager
 def log_context(logger_obj, operation_name: str, level: int = logging.INFO):
     """Context manager for logging operation start and end."""
-    logger_obj.log(level, f"Starting: {operation_name}")
-    start_time = datetime.now()
+    logger_obj.log(level, "Starting: %s", operation_name)
+    start_ns = time.monotonic_ns()
 
     try:
         yield
-        duration = (datetime.now() - start_time).total_seconds()
-        logger_obj.log(level, f"Completed: {operation_name} (took {duration:.4f}s)")
+        duration = (time.monotonic_ns() - start_ns) / 1e9
+        logger_obj.log(level, "Completed: %s (took %.4fs)", operation_name, duration)
     except Exception as e:
-        duration = (datetime.now() - start_time).total_seconds()
-        logger_obj.error(f"Failed: {operation_name} after {duration:.4f}s - {str(e)}")
+        duration = (time.monotonic_ns() - start_ns) / 1e9
+        logger_obj.error("Failed: %s after %.4fs - %s", operation_name, duration, e)
         raise
 load_dotenv()
 
@@ -62,7 +79,6 @@ def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0, jitter_rat
     exp = min(cap, base * (2 ** (attempt - 1)))
     jitter = exp * jitter_ratio
     # Uniform jitter in [exp - jitter, exp + jitter]
-    import random
     return max(0.0, random.uniform(exp - jitter, exp + jitter))
 
 
@@ -72,64 +88,148 @@ def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0, jitter_rat
 
 class SeenCache:
     """
-    Simple JSON-backed de-duplication store for submission IDs.
-    Keeps an in-memory set and persists in the background or on update thresholds.
+    De-duplication store for submission IDs.
+
+    Membership is tracked in a scalable Bloom filter (bounded memory, O(1)
+    lookup) when pybloom-live is available, falling back to an exact set.
+    Persistence is an append-only log: each new ID appends one line instead
+    of rewriting the full ID set, so save cost stays O(1) per add. The log
+    is replayed on startup; a legacy JSON snapshot is migrated if present.
+
+    Bloom false positives only cause an already-idempotent submission to be
+    skipped, which is an acceptable trade for bounded memory.
     """
 
-    def __init__(self, path: str = "seen_submissions.json", autosave_every: int = 50):
+    def __init__(self, path: str = "seen_submissions.json", fsync_every: int = 50):
         self._path = path
+        self._log_path = f"{os.path.splitext(path)[0]}.log"
         self._lock = threading.Lock()
-        self._seen: set[str] = set()
-        self._dirty = 0
-        self._autosave_every = autosave_every
+        if ScalableBloomFilter is not None:
+            self._filter = ScalableBloomFilter(initial_capacity=100_000, error_rate=1e-5)
+        else:
+            logger.info("pybloom-live not installed; seen cache falling back to an exact in-memory set.")
+            self._filter = set()
+        self._log_file = None
+        self._unsynced = 0
+        self._fsync_every = fsync_every
+        # Exact tail of the most recently inserted IDs. The Bloom filter is
+        # not enumerable, so this is what snapshot() hands to monitor threads
+        # for lockless re-delivery checks; stream restarts only ever replay
+        # recent items, so a bounded window is enough.
+        self._recent = deque(maxlen=10_000)
         self._load()
 
+    def _insert(self, submission_id: str) -> bool:
+        """Adds an ID to the membership filter; returns True if it was new."""
+        if isinstance(self._filter, set):
+            if submission_id in self._filter:
+                return False
+            self._filter.add(submission_id)
+            self._recent.append(submission_id)
+            return True
+        if self._filter.add(submission_id):
+            return False
+        self._recent.append(submission_id)
+        return True
+
     def _load(self) -> None:
+        count = 0
+        # Migrate a legacy JSON snapshot, if one exists from an older version.
+        # Its IDs are re-appended to the log and the file is renamed so the
+        # migration runs once instead of on every startup.
         try:
             if os.path.exists(self._path):
-                with open(self._path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                if isinstance(data, list):
-                    self._seen = set(data)
-                elif isinstance(data, dict) and "ids" in data:
-                    self._seen = set(data.get("ids", []))
-                logger.info(f"Seen cache loaded from {self._path}: {len(self._seen)} IDs.")
-            else:
-                logger.info(f"No seen cache found at {self._path}; starting fresh.")
+                with open(self._path, "rb") as f:
+                    data = _json_loads(f.read())
+                ids = data if isinstance(data, list) else data.get("ids", [])
+                for sub_id in ids:
+                    if self._insert(sub_id):
+                        self._append_to_log(sub_id)
+                count += len(ids)
+                # Make sure the replayed IDs are durable in the log before
+                # the legacy file stops being picked up.
+                if self._log_file is not None:
+                    self._log_file.flush()
+                    os.fsync(self._log_file.fileno())
+                    self._unsynced = 0
+                os.replace(self._path, f"{self._path}.migrated")
+                logger.info(
+                    f"Migrated legacy seen cache from {self._path}: {len(ids)} IDs "
+                    f"(renamed to {self._path}.migrated)."
+                )
         except Exception as e:
-            logger.exception(f"Failed to load seen cache from {self._path}: {e}")
+            logger.exception(f"Failed to load legacy seen cache from {self._path}: {e}")
+
+        # Replay the append-only log.
+        try:
+            if os.path.exists(self._log_path):
+                with open(self._log_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        sub_id = line.strip()
+                        if sub_id:
+                            self._insert(sub_id)
+                            count += 1
+            logger.info(f"Seen cache loaded: {count} IDs replayed from {self._log_path}.")
+        except Exception as e:
+            logger.exception(f"Failed to replay seen log from {self._log_path}: {e}")
+
+    def _append_to_log(self, submission_id: str) -> None:
+        if self._log_file is None:
+            os.makedirs(os.path.dirname(self._log_path) or ".", exist_ok=True)
+            self._log_file = open(self._log_path, "a", encoding="utf-8")
+        self._log_file.write(submission_id + "\n")
+        self._unsynced += 1
+        if self._unsynced >= self._fsync_every:
+            self._log_file.flush()
+            os.fsync(self._log_file.fileno())
+            self._unsynced = 0
 
     def save(self) -> None:
+        """Flushes any buffered log lines to disk."""
         try:
             with self._lock:
-                ids = list(self._seen)
-                self._dirty = 0
-            tmp_path = f"{self._path}.tmp"
-            os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
-            with open(tmp_path, "w", encoding="utf-8") as f:
-                json.dump({"ids": ids, "count": len(ids)}, f)
-            os.replace(tmp_path, self._path)
-            logger.info(f"Seen cache saved: {len(ids)} IDs.")
+                if self._log_file is not None:
+                    self._log_file.flush()
+                    os.fsync(self._log_file.fileno())
+                    self._unsynced = 0
+            logger.info(f"Seen log flushed to {self._log_path}.")
         except Exception as e:
-            logger.exception(f"Failed to save seen cache to {self._path}: {e}")
+            logger.exception(f"Failed to flush seen log to {self._log_path}: {e}")
 
     def seen(self, submission_id: str) -> bool:
         with self._lock:
-            return submission_id in self._seen
+            return submission_id in self._filter
+
+    def snapshot(self) -> frozenset:
+        """
+        One-time consistent copy of recently-known IDs, for lockless checks
+        by monitor threads. With the exact-set fallback this is the full ID
+        set; with a Bloom filter it is the bounded tail of recent inserts,
+        which covers everything a restarted stream can re-deliver. IDs
+        outside the snapshot fall back to the locked lookup.
+        """
+        with self._lock:
+            if isinstance(self._filter, set):
+                return frozenset(self._filter)
+            return frozenset(self._recent)
 
     def add(self, submission_id: str) -> None:
-        with self._lock:
-            if submission_id not in self._seen:
-                self._seen.add(submission_id)
-                self._dirty += 1
-                dirty = self._dirty
-            else:
-                dirty = self._dirty
-        if dirty >= self._autosave_every:
-            self.save()
+        try:
+            with self._lock:
+                if self._insert(submission_id):
+                    self._append_to_log(submission_id)
+        except Exception as e:
+            logger.exception(f"Failed to record seen ID {submission_id}: {e}")
 
     def shutdown(self) -> None:
         self.save()
+        with self._lock:
+            if self._log_file is not None:
+                try:
+                    self._log_file.close()
+                except Exception:
+                    pass
+                self._log_file = None
 
 
 _SEEN_CACHE = SeenCache(path=os.getenv("SEEN_CACHE_PATH", "seen_submissions.json"))
@@ -162,16 +262,15 @@ class HealthServer(threading.Thread):
         super().__init__(name="health-server", daemon=True)
         self._host = host
         self._port = port
-        self._server: Optional[HTTPServer] = None
+        self._server: Optional[ThreadingHTTPServer] = None
 
     def run(self):
         try:
-            self._server = HTTPServer((self._host, self._port), HealthHandler)
-            # Set timeout once; handle_request() will block efficiently until timeout or a request arrives
-            self._server.timeout = 0.5
+            self._server = ThreadingHTTPServer((self._host, self._port), HealthHandler)
             logger.info(f"Health server running at http://{self._host}:{self._port}/health")
-            while not _STOP_EVENT.is_set():
-                self._server.handle_request()
+            # Block in the selector until a request arrives or shutdown() is
+            # called — no periodic polling wake-ups while idle.
+            self._server.serve_forever(poll_interval=None)
         except OSError as e:
             logger.warning(f"Health server failed to start: {e}")
         except Exception as e:
@@ -179,6 +278,16 @@ class HealthServer(threading.Thread):
 
     def shutdown(self):
         if self._server:
+            # serve_forever blocks in select() with no timeout, so run the
+            # (blocking) shutdown call in the background and poke the listening
+            # socket to wake the selector immediately.
+            stopper = threading.Thread(target=self._server.shutdown, daemon=True)
+            stopper.start()
+            try:
+                socket.create_connection((self._host, self._port), timeout=1.0).close()
+            except OSError:
+                pass
+            stopper.join(timeout=5.0)
             try:
                 self._server.server_close()
             except Exception:
@@ -204,16 +313,21 @@ def send_message(author_name: str, subject: str, message: str, *, max_retries: i
     while not _STOP_EVENT.is_set() and attempt < max_retries:
         attempt += 1
 
-        # Wait until the next allowed send time without holding the lock
+        # Reserve the send slot with a compare-and-swap on the shared timestamp.
+        # The lock is held only for the read/compare/update — never across a
+        # sleep — so contention between monitor threads stays minimal.
         while not _STOP_EVENT.is_set():
             with _MESSAGE_LOCK:
                 now = time.monotonic()
-                next_allowed = _LAST_MESSAGE_TS + _MESSAGE_MIN_INTERVAL
-                wait_for = max(0.0, next_allowed - now)
-                if wait_for <= 0:
-                    # Reserve the slot by updating timestamp
+                current = _LAST_MESSAGE_TS
+                if now >= current + _MESSAGE_MIN_INTERVAL:
                     _LAST_MESSAGE_TS = now
-                    break
+                    reserved = True
+                else:
+                    reserved = False
+                    wait_for = current + _MESSAGE_MIN_INTERVAL - now
+            if reserved:
+                break
             # Block efficiently until the slot is available or stop is requested
             if _STOP_EVENT.wait(timeout=wait_for):
                 # Stop requested
@@ -285,24 +399,54 @@ def _iter_submissions(subreddit_name: str) -> Iterable:
             sleep_with_stop(5)
 
 
+# Streamer threads enqueue submissions here; a shared worker pool drains the
+# queue so one slow moderation action no longer stalls its subreddit's stream.
+_WORK_QUEUE: queue.Queue = queue.Queue(maxsize=1024)
+
+
 def monitor_subreddit(subreddit_name: str) -> None:
     threading.current_thread().name = f"sub-{subreddit_name}"
     logger.info(f"Monitoring subreddit: r/{subreddit_name}...")
+    # Resolve the rule pipeline once at spin-up so the first submission
+    # doesn't pay the registry lookup either.
+    warm_rules(subreddit_name)
+    # Snapshot the IDs known at thread start; on restart the stream may
+    # re-deliver recent items, and checking the frozen snapshot first avoids
+    # taking the cache lock for those steady-state negative lookups.
+    initial_seen = _SEEN_CACHE.snapshot()
     for submission in _iter_submissions(subreddit_name):
         if _STOP_EVENT.is_set():
             break
         sub_id = getattr(submission, "id", None)
         if not sub_id:
             continue
-        if _SEEN_CACHE.seen(sub_id):
+        if sub_id in initial_seen or _SEEN_CACHE.seen(sub_id):
             continue
         try:
+            _WORK_QUEUE.put((submission, subreddit_name, sub_id), timeout=5.0)
+        except queue.Full:
+            METRICS.set_error(f"work_queue_full_{subreddit_name}")
+            logger.warning(f"Work queue full; dropping submission {sub_id} from r/{subreddit_name}.")
+
+
+def process_submissions() -> None:
+    """Worker loop: drains the shared queue and runs the moderation pipeline."""
+    while True:
+        item = _WORK_QUEUE.get()
+        if item is None:
+            # Shutdown sentinel
+            _WORK_QUEUE.task_done()
+            return
+        submission, subreddit_name, sub_id = item
+        try:
+            # handle_submission records the per-submission metrics itself
             handle_submission(submission, subreddit_name)
             _SEEN_CACHE.add(sub_id)
-            METRICS.incr_submission(subreddit_name, last_id=sub_id)
         except Exception as e:
             METRICS.set_error(f"handle_submission_{subreddit_name}: {e}")
             logger.exception(f"Error handling submission {sub_id} in r/{subreddit_name}: {e}")
+        finally:
+            _WORK_QUEUE.task_done()
 
 
 def monitor_submissions() -> None:
@@ -319,6 +463,15 @@ def monitor_submissions() -> None:
     health_server = HealthServer(host=health_host, port=health_port)
     health_server.start()
 
+    # Worker pool: moderation actions are I/O-bound Reddit calls, so a few
+    # workers per subreddit keep throughput up during bursts.
+    worker_count = int(os.getenv("WORKER_THREADS", str(max(2, 2 * len(subreddits)))))
+    workers: List[threading.Thread] = []
+    for i in range(worker_count):
+        w = threading.Thread(target=process_submissions, name=f"worker-{i}", daemon=True)
+        workers.append(w)
+        w.start()
+
     threads: List[threading.Thread] = []
     for subreddit_name in subreddits:
         t = threading.Thread(target=monitor_subreddit, args=(subreddit_name,), daemon=True)
@@ -332,6 +485,14 @@ def monitor_submissions() -> None:
         logger.info("Shutdown requested (KeyboardInterrupt).")
         _STOP_EVENT.set()
     finally:
+        # Wake each worker with a sentinel so they exit promptly
+        for _ in workers:
+            try:
+                _WORK_QUEUE.put_nowait(None)
+            except queue.Full:
+                break
+        for w in workers:
+            w.join(timeout=5.0)
         # Ensure seen cache is flushed
         _SEEN_CACHE.shutdown()
         # Stop health server
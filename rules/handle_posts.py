@@ -1,9 +1,10 @@
+import functools
 import logging
+import time
 from contextlib import contextmanager
-from datetime import datetime
 from typing import Dict, Any, Optional, Callable
 
-from utilities.globals import chicago_tz, recent_posts, SUBREDDIT_RULES
+from utilities.globals import recent_posts, recent_posts_key, SUBREDDIT_RULES
 from utilities.messaging import send_reply_with_footer
 from utilities.ratelimiter import RATE_LIMITER
 from utilities.metrics import METRICS
@@ -26,26 +27,78 @@ RULE_REGISTRY: Dict[str, Callable[..., Optional[str]]] = {
 }
 
 
+# Resolved per-subreddit pipelines: (rule_name, baked_callable) tuples, with
+# each rule's params already bound via functools.partial. Caching these skips
+# the nested SUBREDDIT_RULES dict lookups, registry resolution, and params
+# indexing on every submission. The cache is invalidated when the rules
+# mapping object itself is replaced (e.g. patched in tests).
+_RESOLVED_RULES: Dict[str, tuple] = {}
+_RESOLVED_SOURCE: Optional[Dict[str, Any]] = None
+
+
+def _resolved_rules(subreddit_name: str) -> tuple:
+    """Returns the cached (rule_name, baked_callable) pipeline for a subreddit."""
+    global _RESOLVED_SOURCE
+    rules_source = SUBREDDIT_RULES
+    if rules_source is not _RESOLVED_SOURCE:
+        _RESOLVED_RULES.clear()
+        _RESOLVED_SOURCE = rules_source
+    resolved = _RESOLVED_RULES.get(subreddit_name)
+    if resolved is None:
+        entries = []
+        subreddit_config = rules_source.get("subreddits", {}).get(subreddit_name, {})
+        for rule in subreddit_config.get("rules", []):
+            rule_name = rule.get("name")
+            rule_func = RULE_REGISTRY.get(rule_name)
+            if not rule_func:
+                logger.error("Rule function '%s' not found in registry. Skipping.", rule_name)
+                continue
+            params = rule.get("params", {})
+            entries.append((rule_name, functools.partial(rule_func, params=params), params))
+        resolved = tuple(entries)
+        _RESOLVED_RULES[subreddit_name] = resolved
+    return resolved
+
+
+def warm_rules(subreddit_name: str) -> tuple:
+    """
+    Resolves and caches a subreddit's rule pipeline up front. Stream workers
+    call this once at spin-up so the first submission doesn't pay the
+    registry resolution either.
+    """
+    return _resolved_rules(subreddit_name)
+
+
 @contextmanager
 def log_context(logger_obj, operation_name: str, level: int = logging.INFO):
     """Context manager for logging operation start and end."""
-    logger_obj.log(level, f"Starting: {operation_name}")
-    start_time = datetime.now()
+    logger_obj.log(level, "Starting: %s", operation_name)
+    start_ns = time.monotonic_ns()
     try:
         yield
-        duration = (datetime.now() - start_time).total_seconds()
-        logger_obj.log(level, f"Completed: {operation_name} (took {duration:.4f}s)")
+        duration = (time.monotonic_ns() - start_ns) / 1e9
+        logger_obj.log(level, "Completed: %s (took %.4fs)", operation_name, duration)
     except Exception as e:
-        duration = (datetime.now() - start_time).total_seconds()
-        logger_obj.error(f"Failed: {operation_name} after {duration:.4f}s - {str(e)}")
+        duration = (time.monotonic_ns() - start_ns) / 1e9
+        logger_obj.error("Failed: %s after %.4fs - %s", operation_name, duration, e)
         raise
 
 
-def _make_log(submission, subreddit_name: str) -> logging.LoggerAdapter:
-    """Creates a logger adapter with contextual submission info."""
-    author = getattr(submission, "author", None)
+def _make_log(submission, subreddit_name: str,
+              sub_id: Optional[str] = None, author: Any = None) -> logging.LoggerAdapter:
+    """
+    Creates a logger adapter with contextual submission info.
+
+    Callers that already materialized the submission id and author (e.g.
+    handle_submission) pass them in so PRAW's lazy attributes are only
+    touched once per submission.
+    """
+    if sub_id is None:
+        sub_id = getattr(submission, "id", "<no-id>")
+    if author is None:
+        author = getattr(submission, "author", None)
     extra = {
-        "submission_id": getattr(submission, "id", "<no-id>"),
+        "submission_id": sub_id,
         "subreddit": subreddit_name,
         "author_id": getattr(author, "id", "<no-author-key>") if author else "<no-author-key>",
         "author_name": getattr(author, "name", "<unknown>") if author else "<no-author>",
@@ -53,25 +106,32 @@ def _make_log(submission, subreddit_name: str) -> logging.LoggerAdapter:
     return logging.LoggerAdapter(logger, extra)
 
 
-def _apply_moderation_action(submission, reason: str, triggered_rule: str, log: logging.LoggerAdapter, subreddit_name: str):
+def _apply_moderation_action(submission, reason: str, triggered_rule: str, log: logging.LoggerAdapter,
+                             subreddit_name: str, rule_params: Optional[Dict[str, Any]] = None):
     """Removes a post and replies with the reason."""
     try:
-        # Increment the counter for the triggered rule first
-        METRICS.incr_rule_trigger(triggered_rule)
-
         wait = RATE_LIMITER.next_available_in()
         if wait > 0:
-            log.debug(f"Rate limit slot not immediately available; waiting ~{wait:.2f}s")
+            log.debug("Rate limit slot not immediately available; waiting ~%.2fs", wait)
+        # One moderation event = one limiter slot; acquiring separately for the
+        # removal and the reply doubled the serialization cost per removal.
+        # Rules with static reasons carry a precomposed reason+footer string
+        # from config load; dynamic reasons still go through the footer helper.
+        full = None
+        if rule_params is not None and reason == rule_params.get("reason"):
+            full = rule_params.get("_full_message")
         with RATE_LIMITER:
             submission.mod.remove()
+            if full is not None:
+                submission.reply(full)
+            else:
+                send_reply_with_footer(submission, reason, subreddit_name)
         log.warning(
             "Removed post",
             extra={"reason": reason, "triggered_rule": triggered_rule, "action": "remove"},
         )
-        with RATE_LIMITER:
-            send_reply_with_footer(submission, reason, subreddit_name)
     except Exception as e:
-        log.exception(f"Failed to apply moderation action for rule '{triggered_rule}': {e}")
+        log.exception("Failed to apply moderation action for rule '%s': %s", triggered_rule, e)
 
 
 def _approve_post(submission, log: logging.LoggerAdapter):
@@ -79,80 +139,106 @@ def _approve_post(submission, log: logging.LoggerAdapter):
     try:
         wait = RATE_LIMITER.next_available_in()
         if wait > 0:
-            log.debug(f"Rate limit slot not immediately available; waiting ~{wait:.2f}s")
+            log.debug("Rate limit slot not immediately available; waiting ~%.2fs", wait)
         with RATE_LIMITER:
             submission.mod.approve()
         log.info("Post approved", extra={"action": "approve"})
     except Exception as e:
-        log.exception(f"Failed to approve post: {e}")
+        log.exception("Failed to approve post: %s", e)
 
 
 def handle_submission(submission, subreddit_name: str) -> None:
     """
     Handles a new submission by processing it through a data-driven rule pipeline.
     """
-    log = _make_log(submission, subreddit_name)
-    operation_name = f"handle_submission(id={getattr(submission, 'id', '<no-id>')}, sub={subreddit_name})"
+    # Materialize lazy identity attributes once; everything below (logging,
+    # rules, rate-limit recording) reuses these locals.
+    sub_id = getattr(submission, "id", "<no-id>")
+    author = getattr(submission, "author", None)
+    log = _make_log(submission, subreddit_name, sub_id=sub_id, author=author)
+    operation_name = f"handle_submission(id={sub_id}, sub={subreddit_name})"
 
     with log_context(log.logger, operation_name):
-        author = getattr(submission, "author", None)
         if not author:
             log.warning("Submission has no author; skipping moderation.")
+            # Still a processed submission: keep /metrics counts meaning
+            # "handled", not "ran the rule pipeline".
+            METRICS.record_event(subreddit_name, submission_id=sub_id)
             return
 
-        # Load rules for the current subreddit
-        subreddit_config = SUBREDDIT_RULES.get("subreddits", {}).get(subreddit_name, {})
-        rules_to_run = subreddit_config.get("rules", [])
+        # Touch lazy PRAW attributes once and share the values across all rules.
+        # Repeated attribute access on submission/author can trigger redundant
+        # lazy fetches inside PRAW.
+        title = getattr(submission, "title", None) or ""
+        body = getattr(submission, "selftext", None) or ""
+        # Single combined string so text rules scan once instead of once per
+        # field. Blank-line separator prevents cross-boundary matches.
+        haystack = f"{title}\n\n{body}"
+        meta = {
+            "over_18": getattr(submission, "over_18", False),
+            "link_flair_text": getattr(submission, "link_flair_text", None),
+            "created_utc": getattr(author, "created_utc", None),
+            "link_karma": getattr(author, "link_karma", 0),
+            "comment_karma": getattr(author, "comment_karma", 0),
+        }
+
+        # Load the pre-resolved rule pipeline for the current subreddit
+        rules_to_run = _resolved_rules(subreddit_name)
 
         if not rules_to_run:
             log.warning("No rules found for subreddit, taking no action.")
+            METRICS.record_event(subreddit_name, submission_id=sub_id)
             return
 
         # --- Rule Processing Loop ---
         removal_reason = None
         triggered_rule = None
+        triggered_params = None
 
-        for rule in rules_to_run:
-            rule_name = rule.get("name")
-            rule_params = rule.get("params", {})
-            rule_func = RULE_REGISTRY.get(rule_name)
-
-            if not rule_func:
-                log.error(f"Rule function '{rule_name}' not found in registry. Skipping.")
-                continue
-
-            log.debug(f"Executing rule: {rule_name}")
+        for rule_name, rule_call, rule_params in rules_to_run:
+            log.debug("Executing rule: %s", rule_name)
             try:
-                # Pass common objects to every rule function
-                reason = rule_func(
+                # Pass common objects to every rule function; its params are
+                # already baked into the partial.
+                reason = rule_call(
                     submission=submission,
                     author=author,
-                    params=rule_params,
                     subreddit_name=subreddit_name,
-                    log=log
+                    log=log,
+                    title=title,
+                    body=body,
+                    haystack=haystack,
+                    meta=meta,
                 )
                 if reason:
                     removal_reason = reason
                     triggered_rule = rule_name
-                    log.info(f"Rule '{rule_name}' triggered removal. Reason: {reason}")
+                    triggered_params = rule_params
+                    log.info("Rule '%s' triggered removal. Reason: %s", rule_name, reason)
                     break  # Stop on the first triggered rule
             except Exception as e:
-                log.exception(f"An unexpected error occurred while executing rule '{rule_name}': {e}")
+                log.exception("An unexpected error occurred while executing rule '%s': %s", rule_name, e)
                 # Optional: decide if a single rule failure should stop the whole process
                 # For now, we'll log and continue
                 continue
 
         # --- Apply Final Action ---
         if removal_reason and triggered_rule:
-            _apply_moderation_action(submission, removal_reason, triggered_rule, log, subreddit_name)
+            _apply_moderation_action(submission, removal_reason, triggered_rule, log,
+                                     subreddit_name, rule_params=triggered_params)
         else:
             # If no rules resulted in removal, approve the post
             _approve_post(submission, log)
 
+        # One batched metrics update per submission (single lock round-trip)
+        METRICS.record_event(subreddit_name, rule=triggered_rule, submission_id=sub_id)
+
         # Always record post for rate-limiting purposes, even if removed
         try:
             author_key = getattr(author, "id", getattr(author, "name", "<unknown>"))
-            now = datetime.now(chicago_tz)
-            recent_posts.setdefault((author_key, subreddit_name), []).append(now)
+            # recent_posts is a defaultdict of bounded deques keyed on a flat
+            # string, holding epoch-second floats: C-level float compares in
+            # is_spamming instead of tz-aware datetime comparisons.
+            recent_posts[recent_posts_key(author_key, subreddit_name)].append(time.time())
         except Exception as e:
-            log.exception("Failed to record recent post for rate-limiting: {e}")
\ No newline at end of file
+            log.exception("Failed to record recent post for rate-limiting: %s", e)
\ No newline at end of file
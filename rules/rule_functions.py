@@ -1,52 +1,189 @@
 
+import functools
 import re
 import logging
-from datetime import datetime
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, List, Optional
 
-import pytz
-
-from utilities.globals import chicago_tz, REQUIRED_DISCORD_LINK
+from utilities.globals import REQUIRED_DISCORD_LINK
 from utilities.spam_offensive import is_actually_offensive, is_spamming
 
+try:
+    # Optional: single-pass multi-pattern scanning; falls back to per-pattern re
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
 logger = logging.getLogger(__name__)
 
+# Privacy patterns are static; fuse them into one alternation compiled at
+# import so the regex engine traverses the text once instead of once per pattern.
+_PRIVACY_RE = re.compile(
+    "|".join(
+        f"(?:{p})"
+        for p in (
+            r"\bleak(ed|s)?\b",
+            r"\bdoxx(ing|ed|es)?\b",
+            r"personal info(?:rmation)?",
+            r"(?<!not\s)(?<!no\s)\bip\s?(address|log)?\b",
+            r"\b(real\s)?name\b",
+            r"\b(address(es)?|home\saddress|location|coords?)\b",
+            r"(discord\s)?user(name|tag)[\s:]*[a-zA-Z0-9#]{5,}",
+            r"(snapchat|instagram|twitter|email|phone\s?number|contact info)",
+            r"(?<!not\s)(?<!no\s)\bface\s?(reveal|pic|photo)?\b",
+            r"(?<!not\s)(?<!no\s)\birl\b",
+            r"\bexposed\b",
+        )
+    ),
+    re.IGNORECASE,
+)
+
+
+def _compile_params_patterns(params: Dict[str, Any], cache_key: str, raw_patterns) -> list:
+    """
+    Compiles a list of regex strings once and caches the result in `params`.
+
+    Rule params come straight from the rules JSON and are reused for every
+    submission, so stashing the compiled patterns alongside them avoids
+    re-parsing each regex on the hot path. Invalid patterns are logged and
+    dropped at compile time.
+    """
+    compiled = params.get(cache_key)
+    if compiled is None:
+        compiled = []
+        for pattern in raw_patterns:
+            if isinstance(pattern, re.Pattern):
+                # Already compiled at config load (utilities.globals)
+                compiled.append(pattern)
+                continue
+            try:
+                compiled.append(re.compile(pattern, re.IGNORECASE))
+            except re.error as e:
+                logger.error("Invalid regex pattern '%s': %s", pattern, e)
+        params[cache_key] = compiled
+    return compiled
+
+
+def _build_hyperscan_db(patterns) -> Optional[Any]:
+    """
+    Compiles a pattern list into one Hyperscan block-mode database so a whole
+    rule's pattern set is matched in a single scan. Returns None when
+    hyperscan is unavailable or a pattern uses unsupported syntax, in which
+    case callers keep the per-pattern re path.
+    """
+    if hyperscan is None or not patterns:
+        return None
+    try:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[p.encode("utf-8") for p in patterns],
+            ids=list(range(len(patterns))),
+            flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(patterns),
+        )
+        return db
+    except Exception as e:
+        logger.info("Hyperscan compile failed (%s); using per-pattern re fallback.", e)
+        return None
+
+
+def _hyperscan_first_match(db, text: str) -> Optional[int]:
+    """Scans `text` once and returns the id of the first matching pattern."""
+    hits: List[int] = []
+
+    def _on_match(pat_id, start, end, flags, context=None):
+        hits.append(pat_id)
+        return 1  # halt the scan on the first hit
+
+    try:
+        db.scan(text.encode("utf-8", "ignore"), match_event_handler=_on_match)
+    except hyperscan.ScanTerminated:
+        pass
+    return hits[0] if hits else None
+
+
+def _haystack_for(submission, haystack: Optional[str]) -> str:
+    """Returns the combined title+body text, building it only when the caller
+    did not already pass the shared per-submission haystack."""
+    if haystack is None:
+        title = submission.title or ""
+        body = submission.selftext or ""
+        haystack = f"{title}\n\n{body}"
+    return haystack
 
-def check_account_restrictions(submission, author, params: Dict[str, Any], **kwargs) -> Optional[str]:
+
+@functools.lru_cache(maxsize=4096)
+def _evaluate_account_restrictions(created_utc, link_karma, comment_karma,
+                                   min_age_s, min_karma, now_bucket: int) -> Optional[str]:
+    """
+    Pure age/karma evaluation memoized on the author's immutable-ish fields.
+
+    An author posting back-to-back across subreddits hits the cache instead
+    of redoing the datetime math. `now_bucket` folds wall-clock time into the
+    key in 5-minute steps so entries age out without explicit invalidation.
+    Returns the failed check ("age" or "karma") or None.
+    """
+    if min_age_s is not None and created_utc:
+        # created_utc is epoch seconds and min_age_s is precomputed at rules
+        # load, so the age check is one float subtract and compare.
+        # `now_bucket * 300` reconstructs "now" at the bucket granularity,
+        # keeping this function pure for the cache.
+        account_age_s = now_bucket * 300 - created_utc
+        if account_age_s < min_age_s:
+            logger.debug("Account age (%.1fd) is less than required (%.1fd).",
+                         account_age_s / 86400.0, min_age_s / 86400.0)
+            return "age"
+
+    if min_karma is not None:
+        combined_karma = (link_karma or 0) + (comment_karma or 0)
+        if combined_karma < min_karma:
+            logger.debug("Combined karma (%s) is less than required (%s).", combined_karma, min_karma)
+            return "karma"
+
+    return None
+
+
+def check_account_restrictions(submission, author, params: Dict[str, Any],
+                               meta: Optional[Dict[str, Any]] = None, **kwargs) -> Optional[str]:
     """
     Checks if the author's account meets age and karma requirements.
+
+    `meta` optionally carries pre-fetched author attributes so repeated PRAW
+    lazy loads are avoided when called from the submission pipeline.
     """
-    now = datetime.now(chicago_tz)
-    min_age_days = params.get("min_account_age_days")
+    min_age_s = params.get("_min_account_age_s")
+    if min_age_s is None:
+        # Config not routed through the globals load pass (e.g. tests):
+        # derive and cache the precomputed form on first use.
+        min_age_days = params.get("min_account_age_days")
+        if min_age_days is not None:
+            min_age_s = float(min_age_days) * 86400.0
+            params["_min_account_age_s"] = min_age_s
     min_karma = params.get("min_combined_karma")
 
-    if not min_age_days and not min_karma:
+    if min_age_s is None and not min_karma:
         return None
 
+    if meta is None:
+        meta = {}
+
     try:
-        # Account Age Check
-        if min_age_days is not None:
-            created_utc = getattr(author, "created_utc", None)
-            if created_utc:
-                account_created_dt = datetime.fromtimestamp(created_utc, pytz.utc).astimezone(chicago_tz)
-                account_age_days = (now - account_created_dt).days
-                if account_age_days < min_age_days:
-                    logger.debug(f"Account age ({account_age_days}d) is less than required ({min_age_days}d).")
-                    return params.get("reason", "Account does not meet age requirements.")
-            else:
-                logger.warning("Could not determine account age for author.")
-
-        # Karma Check
-        if min_karma is not None:
-            link_karma = getattr(author, "link_karma", 0)
-            comment_karma = getattr(author, "comment_karma", 0)
-            combined_karma = (link_karma or 0) + (comment_karma or 0)
-            if combined_karma < min_karma:
-                logger.debug(f"Combined karma ({combined_karma}) is less than required ({min_karma}).")
-                return params.get("reason", "Account does not meet karma requirements.")
+        created_utc = meta.get("created_utc", getattr(author, "created_utc", None))
+        if min_age_s is not None and not created_utc:
+            logger.warning("Could not determine account age for author.")
+        link_karma = meta.get("link_karma", getattr(author, "link_karma", 0))
+        comment_karma = meta.get("comment_karma", getattr(author, "comment_karma", 0))
+
+        failed = _evaluate_account_restrictions(
+            created_utc, link_karma, comment_karma,
+            min_age_s, min_karma, int(time.time() // 300),
+        )
+        if failed == "age":
+            return params.get("reason", "Account does not meet age requirements.")
+        if failed == "karma":
+            return params.get("reason", "Account does not meet karma requirements.")
 
     except Exception as e:
-        logger.exception(f"Failed to evaluate account restrictions: {e}")
+        logger.exception("Failed to evaluate account restrictions: %s", e)
 
     return None
 
@@ -59,7 +196,10 @@ def enforce_rate_limit(submission, author, params: Dict[str, Any], subreddit_nam
     window_hours = params.get("window_hours", 0)
     window_minutes = params.get("window_minutes", 0)
 
-    if not max_posts or (window_hours == 0 and window_minutes == 0):
+    # _window_s is precomputed at rules load; fall back to the raw fields for
+    # configs that did not go through the globals pass.
+    window_s = params.get("_window_s", window_hours * 3600 + window_minutes * 60)
+    if not max_posts or not window_s:
         return None
 
     author_key = getattr(author, "id", getattr(author, "name", "<unknown>"))
@@ -69,93 +209,100 @@ def enforce_rate_limit(submission, author, params: Dict[str, Any], subreddit_nam
     return None
 
 
-def disallow_nsfw_and_offensive(submission, author, params: Dict[str, Any], **kwargs) -> Optional[str]:
+def disallow_nsfw_and_offensive(submission, author, params: Dict[str, Any],
+                                haystack: Optional[str] = None,
+                                meta: Optional[Dict[str, Any]] = None, **kwargs) -> Optional[str]:
     """
     Checks for NSFW flags or offensive content in title/body.
     """
-    title = submission.title or ""
-    body = submission.selftext or ""
+    haystack = _haystack_for(submission, haystack)
 
     try:
-        is_nsfw = getattr(submission, "over_18", False)
-        title_offensive = bool(title) and is_actually_offensive(title)
-        body_offensive = bool(body) and is_actually_offensive(body)
+        is_nsfw = meta.get("over_18") if meta else getattr(submission, "over_18", False)
 
-        if is_nsfw or title_offensive or body_offensive:
+        if is_nsfw or is_actually_offensive(haystack):
             return params.get("reason", "Post contains NSFW or offensive content.")
     except Exception as e:
-        logger.exception(f"Failed NSFW/offensive evaluation: {e}")
+        logger.exception("Failed NSFW/offensive evaluation: %s", e)
 
     return None
 
 
-def require_discord_link(submission, author, params: Dict[str, Any], **kwargs) -> Optional[str]:
+def require_discord_link(submission, author, params: Dict[str, Any],
+                         haystack: Optional[str] = None, **kwargs) -> Optional[str]:
     """
     Requires a Discord invite link in the title or body.
     """
-    title = submission.title or ""
-    body = submission.selftext or ""
+    haystack = _haystack_for(submission, haystack)
 
     try:
-        has_invite = REQUIRED_DISCORD_LINK.search(title) or REQUIRED_DISCORD_LINK.search(body)
-        if not has_invite:
+        # Cheap substring prescreen: the invite regex cannot match without
+        # "discord" in the text, and str.__contains__ is far cheaper than
+        # starting the regex engine.
+        if "discord" not in haystack.lower():
+            return params.get("reason", "Post must contain a Discord invite link.")
+        if not REQUIRED_DISCORD_LINK.search(haystack):
             return params.get("reason", "Post must contain a Discord invite link.")
     except Exception as e:
-        logger.exception(f"Failed Discord link check: {e}")
+        logger.exception("Failed Discord link check: %s", e)
 
     return None
 
 
-def check_banned_patterns(submission, author, params: Dict[str, Any], **kwargs) -> Optional[str]:
+def check_banned_patterns(submission, author, params: Dict[str, Any],
+                          haystack: Optional[str] = None, **kwargs) -> Optional[str]:
     """
     Checks the title and body against a list of banned regex patterns.
     """
-    title = submission.title or ""
-    body = submission.selftext or ""
-    patterns = params.get("patterns", [])
+    haystack = _haystack_for(submission, haystack)
+    raw_patterns = params.get("patterns", [])
+    # Config loading may have compiled these already; normalize to strings for
+    # hyperscan and reason reporting.
+    pattern_strings = [p.pattern if isinstance(p, re.Pattern) else p for p in raw_patterns]
+
+    # Prefer one DFA scan over the whole pattern set when hyperscan is present.
+    if "_hs_db" not in params:
+        params["_hs_db"] = _build_hyperscan_db(pattern_strings)
+    db = params["_hs_db"]
+    if db is not None:
+        idx = _hyperscan_first_match(db, haystack)
+        if idx is not None:
+            specific_reason = params.get("reason", "Post contains a banned pattern.")
+            return f"{specific_reason} (Matched: '{pattern_strings[idx]}')"
+        return None
+
+    # Fused-alternation prescreen (built at config load): the common
+    # no-match case costs one engine pass instead of one per pattern.
+    union = params.get("_patterns_union")
+    if union is not None and union.search(haystack) is None:
+        return None
+
+    compiled = _compile_params_patterns(params, "_compiled", raw_patterns)
 
-    for pattern in patterns:
-        try:
-            if re.search(pattern, title, re.IGNORECASE) or re.search(pattern, body, re.IGNORECASE):
-                # Return a more specific reason if possible
-                specific_reason = params.get("reason", "Post contains a banned pattern.")
-                return f"{specific_reason} (Matched: '{pattern}')"
-        except re.error as e:
-            logger.error(f"Invalid regex pattern in ban_patterns '{pattern}': {e}")
+    for pattern in compiled:
+        if pattern.search(haystack):
+            # Return a more specific reason if possible
+            specific_reason = params.get("reason", "Post contains a banned pattern.")
+            return f"{specific_reason} (Matched: '{pattern.pattern}')"
 
     return None
 
 
-def respect_privacy(submission, author, params: Dict[str, Any], **kwargs) -> Optional[str]:
+def respect_privacy(submission, author, params: Dict[str, Any],
+                    haystack: Optional[str] = None, **kwargs) -> Optional[str]:
     """
     Checks for content that violates privacy rules (doxxing, personal info, etc.).
     """
-    body = submission.selftext or ""
-    privacy_patterns = [
-        r"\\bleak(ed|s)?\\b",
-        r"\\bdoxx(ing|ed|es)?\\b",
-        r"personal info(?:rmation)?",
-        r"(?<!not\\s)(?<!no\\s)\\bip\\s?(address|log)?\\b",
-        r"\\b(real\\s)?name\\b",
-        r"\\b(address(es)?|home\\saddress|location|coords?)\\b",
-        r"(discord\\s)?user(name|tag)[\\s:]*[a-zA-Z0-9#]{5,}",
-        r"(snapchat|instagram|twitter|email|phone\\s?number|contact info)",
-        r"(?<!not\\s)(?<!no\\s)\\bface\\s?(reveal|pic|photo)?\\b",
-        r"(?<!not\\s)(?<!no\\s)\\birl\\b",
-        r"\\bexposed\\b",
-    ]
+    haystack = _haystack_for(submission, haystack)
 
-    try:
-        for pattern in privacy_patterns:
-            if re.search(pattern, body, re.IGNORECASE):
-                return params.get("reason", "Post violates privacy rules.")
-    except re.error as e:
-        logger.error(f"Invalid regex in privacy patterns: {e}")
+    if _PRIVACY_RE.search(haystack):
+        return params.get("reason", "Post violates privacy rules.")
 
     return None
 
 
-def require_ad_flair(submission, author, params: Dict[str, Any], **kwargs) -> Optional[str]:
+def require_ad_flair(submission, author, params: Dict[str, Any],
+                     meta: Optional[Dict[str, Any]] = None, **kwargs) -> Optional[str]:
     """
     Requires the submission to have a specific link flair.
     """
@@ -164,14 +311,21 @@ def require_ad_flair(submission, author, params: Dict[str, Any], **kwargs) -> Op
         logger.warning("No flairs configured for 'require_ad_flair' rule.")
         return None
 
-    flair = getattr(submission, "link_flair_text", None)
-    if not flair or flair.lower() not in [f.lower() for f in required_flairs]:
+    flair = meta.get("link_flair_text") if meta else getattr(submission, "link_flair_text", None)
+    # Flair config is static per rule; lowercase it once and keep a frozenset
+    # for O(1) membership instead of rebuilding a list per submission.
+    allowed = params.get("_flairs_lower")
+    if allowed is None:
+        allowed = frozenset(f.lower() for f in required_flairs)
+        params["_flairs_lower"] = allowed
+    if not flair or flair.lower() not in allowed:
         return params.get("reason", f"Post must have one of the required flairs: {', '.join(required_flairs)}")
 
     return None
 
 
-def validate_post_format(submission, author, params: Dict[str, Any], **kwargs) -> Optional[str]:
+def validate_post_format(submission, author, params: Dict[str, Any],
+                         title: Optional[str] = None, **kwargs) -> Optional[str]:
     """
     Validates that the post title matches a required format (e.g., starts with '[WTS]').
     """
@@ -180,31 +334,52 @@ def validate_post_format(submission, author, params: Dict[str, Any], **kwargs) -
         logger.warning("No title_pattern configured for 'validate_post_format' rule.")
         return None
 
-    title = submission.title or ""
-    try:
-        if not re.search(title_pattern, title):
-            return params.get("reason", "Post title does not match the required format.")
-    except re.error as e:
-        logger.error(f"Invalid regex in validate_post_format pattern '{title_pattern}': {e}")
+    if title is None:
+        title = submission.title or ""
+    compiled = params.get("_compiled_title")
+    if compiled is None:
+        if isinstance(title_pattern, re.Pattern):
+            # Already compiled at config load (utilities.globals)
+            compiled = title_pattern
+        else:
+            try:
+                compiled = re.compile(title_pattern)
+            except re.error as e:
+                logger.error("Invalid regex in validate_post_format pattern '%s': %s", title_pattern, e)
+                compiled = re.compile("")  # match-anything fallback so the rule never removes on a bad config
+        params["_compiled_title"] = compiled
+
+    if not compiled.search(title):
+        return params.get("reason", "Post title does not match the required format.")
 
     return None
 
 
-def monitor_for_heated_discussion_keywords(submission, author, params: Dict[str, Any], **kwargs) -> Optional[str]:
+def monitor_for_heated_discussion_keywords(submission, author, params: Dict[str, Any],
+                                           haystack: Optional[str] = None, **kwargs) -> Optional[str]:
     """
     Checks for keywords that might indicate a heated or uncivil discussion.
     """
-    title = submission.title or ""
-    body = submission.selftext or ""
+    haystack = _haystack_for(submission, haystack)
     keywords = params.get("keywords", [])
+    # Using word boundaries to avoid matching parts of other words
+    wrapped = [r"\b" + re.escape(kw) + r"\b" for kw in keywords]
+
+    # Prefer one DFA scan over the whole keyword set when hyperscan is present.
+    if "_hs_kw_db" not in params:
+        params["_hs_kw_db"] = _build_hyperscan_db(wrapped)
+    db = params["_hs_kw_db"]
+    if db is not None:
+        idx = _hyperscan_first_match(db, haystack)
+        if idx is not None:
+            keyword = keywords[idx]
+            return params.get("reason", f"Post contains keywords that suggest a heated discussion ('{keyword}'). Please remain civil.")
+        return None
+
+    compiled = _compile_params_patterns(params, "_compiled_keywords", wrapped)
 
-    for keyword in keywords:
-        try:
-            # Using word boundaries to avoid matching parts of other words
-            pattern = r'\\b' + re.escape(keyword) + r'\\b'
-            if re.search(pattern, title, re.IGNORECASE) or re.search(pattern, body, re.IGNORECASE):
-                return params.get("reason", f"Post contains keywords that suggest a heated discussion ('{keyword}'). Please remain civil.")
-        except re.error as e:
-            logger.error(f"Invalid regex created from keyword '{keyword}': {e}")
+    for keyword, pattern in zip(keywords, compiled):
+        if pattern.search(haystack):
+            return params.get("reason", f"Post contains keywords that suggest a heated discussion ('{keyword}'). Please remain civil.")
 
     return None
@@ -4,9 +4,10 @@ from unittest.mock import MagicMock, patch
 from rules import handle_posts
 
 
-@pytest.fixture
-def mock_submission(mocker):
-    """Fixture to create a mock PRAW submission object with a mock author."""
+@pytest.fixture(scope="module")
+def mock_submission():
+    """Fixture to create a mock PRAW submission object with a mock author
+    (module-scoped; per-test call records are wiped by the autouse reset)."""
     submission = MagicMock()
     submission.author = MagicMock()
     submission.author.name = "test_author"
@@ -20,6 +21,13 @@ def mock_submission(mocker):
     return submission
 
 
+@pytest.fixture(autouse=True)
+def _reset_submission(mock_submission):
+    """Clears recorded calls (mod.remove/approve, reply, ...) between tests."""
+    mock_submission.reset_mock()
+    yield
+
+
 @patch('rules.handle_posts.SUBREDDIT_RULES', {
     "subreddits": {
         "testsub": {
@@ -8,9 +8,10 @@ from rules import rule_functions
 from utilities.globals import chicago_tz
 
 
-@pytest.fixture
-def mock_author(mocker):
-    """Fixture to create a mock PRAW author object."""
+@pytest.fixture(scope="module")
+def mock_author():
+    """Fixture to create a mock PRAW author object (module-scoped; tests only
+    read it, so one instance serves the whole file)."""
     author = MagicMock()
     author.name = "test_author"
     author.id = "author123"
@@ -21,9 +22,9 @@ def mock_author(mocker):
     return author
 
 
-@pytest.fixture
-def mock_submission(mocker, mock_author):
-    """Fixture to create a mock PRAW submission object."""
+@pytest.fixture(scope="module")
+def mock_submission(mock_author):
+    """Fixture to create a mock PRAW submission object (module-scoped)."""
     submission = MagicMock()
     submission.author = mock_author
     submission.title = "Test Title"
@@ -33,6 +34,18 @@ def mock_submission(mocker, mock_author):
     return submission
 
 
+@pytest.fixture(autouse=True)
+def _reset_submission(mock_submission, mock_author):
+    """Restores the attributes individual tests mutate on the shared mocks."""
+    mock_submission.reset_mock()
+    mock_submission.author = mock_author
+    mock_submission.title = "Test Title"
+    mock_submission.selftext = "Test body content."
+    mock_submission.over_18 = False
+    mock_submission.link_flair_text = "Discussion"
+    yield
+
+
 # --- Tests for check_account_restrictions ---
 
 def test_check_account_restrictions_pass(mock_submission, mock_author):
@@ -1,13 +1,26 @@
 from __future__ import annotations
 
+import logging
 import os
 import re
-from json import load
+import sys
+from collections import defaultdict, deque
+from itertools import product
 from pathlib import Path
 from typing import Dict, List, Pattern, Final
+from zoneinfo import ZoneInfo
 
 import praw
-import pytz
+
+from utilities.messaging import full_message
+
+logger = logging.getLogger(__name__)
+
+try:
+    # Optional: orjson parses the rules file a few times faster at startup
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
 
 try:
     # Optional: load .env only in local/dev environments
@@ -18,8 +31,8 @@ except Exception:
     # dotenv is optional; ignoring failures keeps prod containers lighter
     pass
 
-# Timezone (keep a single shared tzinfo)
-chicago_tz: Final = pytz.timezone("America/Chicago")
+# Timezone (keep a single shared tzinfo; zoneinfo is C-backed and faster than pytz)
+chicago_tz: Final = ZoneInfo("America/Chicago")
 
 
 # App configuration helpers
@@ -55,9 +68,24 @@ MAX_POSTS: Final[int] = 1
 MIN_ACCOUNT_AGE_DAYS: Final[int] = 60
 MIN_COMBINED_KARMA: Final[int] = 20
 
-# Track recent posts; keep empty at startup to avoid stale fixtures
-# Key convention: (author_key, subreddit_name) where author_key is author.id or author.name
-recent_posts: Dict[tuple, List] = {}
+# Track recent posts; keep empty at startup to avoid stale fixtures.
+# Key convention: f"{author_key}|{subreddit_name}" where author_key is
+# author.id or author.name — a flat string hashes faster than a tuple.
+# Bounded deques cap memory per author and make left-side eviction O(1).
+# NOTE: is_spamming evicts expired entries destructively, which assumes at
+# most one enforce_rate_limit window per subreddit; a second rule with a
+# longer window on the same subreddit would see entries the shorter-window
+# rule already dropped and undercount.
+recent_posts: Dict[str, deque] = defaultdict(lambda: deque(maxlen=64))
+
+
+def recent_posts_key(author_key: str, subreddit_name: str) -> str:
+    """Builds the flat recent_posts key shared by producers and is_spamming.
+
+    The composed key is interned: repeat posters hit the same canonical
+    string object, so dict hashing short-circuits to a pointer compare.
+    """
+    return sys.intern(f"{author_key}|{subreddit_name}")
 
 # Profanity library init is cheap but guard just in case
 try:
@@ -68,6 +96,64 @@ except Exception:
     # If loading fails, the app should still function; the checker can handle absence gracefully
     pass
 
+def _expand_profanity_variants() -> frozenset:
+    """
+    Expands every censor word through better_profanity's character
+    substitution map (e.g. "bitch" -> "b1tch", "b*tch", ...) once at import.
+    The library performs this matching lazily per comparison; materializing
+    the combinations up front lets the automaton prescreen and the exact-set
+    token confirmation in spam_offensive recognize the same variants without
+    any per-call generation. All substitution options are single characters,
+    so the expansion is an exact equivalent of the library's matching.
+    Falls back to canonical forms only (then empty) if expansion fails.
+    """
+    try:
+        mapping = profanity.CHARS_MAPPING
+        variants = set()
+        for entry in profanity.CENSOR_WORDSET:
+            word = str(entry).lower()
+            if not word:
+                continue
+            variants.update(
+                map("".join, product(*(mapping.get(ch, (ch,)) for ch in word)))
+            )
+        return frozenset(variants)
+    except Exception:
+        try:
+            return frozenset(w for w in (str(e).lower() for e in profanity.CENSOR_WORDSET) if w)
+        except Exception:
+            return frozenset()
+
+
+PROFANITY_VARIANTS: Final[frozenset] = _expand_profanity_variants()
+
+# Optional Aho-Corasick automaton over the censor list: one linear pass over
+# the text instead of repeated substring searches. Built from the expanded
+# variant set above, so leet spellings hit the prescreen directly; the
+# per-word confirmation stage in spam_offensive then filters substring
+# false positives against the same variant set.
+PROFANITY_AUTOMATON = None
+try:
+    import ahocorasick
+
+    _ac = ahocorasick.Automaton()
+    for _word in PROFANITY_VARIANTS:
+        _ac.add_word(_word, _word)
+    _ac.make_automaton()
+    PROFANITY_AUTOMATON = _ac
+except Exception:
+    # pyahocorasick is optional; better_profanity remains the fallback scanner
+    PROFANITY_AUTOMATON = None
+
+
+def is_actually_offensive_fast(text: str) -> bool:
+    """
+    Returns True if any censor-list word (including substitution variants)
+    occurs as a substring of `text` (expected lowercased). Single linear
+    automaton scan; only valid when PROFANITY_AUTOMATON is not None.
+    """
+    return next(PROFANITY_AUTOMATON.iter(text), None) is not None
+
 # Banned patterns (kept here only if you need a global fallback).
 # Prefer configuring patterns per-subreddit in rules JSON.
 BANNED_PATTERNS: List[Pattern[str]] = [
@@ -76,6 +162,69 @@ BANNED_PATTERNS: List[Pattern[str]] = [
     re.compile(r"(?i)\bgiveaway\b"),
 ]
 
+# Fused alternation of the fallback patterns: one engine pass over the text
+# instead of one per pattern. Inline (?i) markers are stripped because
+# Python 3.11+ rejects global flags mid-expression; IGNORECASE is applied
+# to the union as a whole instead.
+BANNED_PATTERNS_UNION: Final[Pattern[str]] = re.compile(
+    "|".join(f"(?:{p.pattern.replace('(?i)', '')})" for p in BANNED_PATTERNS),
+    re.IGNORECASE,
+)
+
+
+def contains_banned(text: str) -> bool:
+    """Single-pass check of `text` against the global banned-pattern fallback."""
+    if HS_DB is not None:
+        return hs_any_match(text) is not None
+    return BANNED_PATTERNS_UNION.search(text) is not None
+
+# Optional Hyperscan (JIT'd DFA) database over the global banned patterns:
+# one pass per character regardless of pattern count. Gated by an env flag so
+# it can be switched off without redeploying; falls back to the fused re
+# union when hyperscan is missing, disabled, or rejects a pattern.
+# REQUIRED_DISCORD_LINK is excluded — hyperscan does not support its
+# lookahead — and keeps its own compiled re below.
+try:
+    import hyperscan as _hyperscan
+except ImportError:
+    _hyperscan = None
+
+HS_ENABLED: Final[bool] = os.getenv("HYPERSCAN_ENABLED", "1").lower() not in ("0", "false", "no")
+
+HS_DB = None
+if _hyperscan is not None and HS_ENABLED:
+    try:
+        _hs_db = _hyperscan.Database(mode=_hyperscan.HS_MODE_BLOCK)
+        _hs_db.compile(
+            expressions=[p.pattern.replace("(?i)", "").encode("utf-8") for p in BANNED_PATTERNS],
+            ids=list(range(len(BANNED_PATTERNS))),
+            flags=[_hyperscan.HS_FLAG_CASELESS | _hyperscan.HS_FLAG_SINGLEMATCH] * len(BANNED_PATTERNS),
+        )
+        HS_DB = _hs_db
+    except Exception as e:
+        logger.info("Hyperscan compile failed (%s); using re fallback for banned patterns.", e)
+        HS_DB = None
+
+
+def hs_any_match(text: str):
+    """
+    Scans `text` once against the global banned-pattern database and returns
+    the id of the first matching pattern, or None. Callers must check HS_DB
+    is not None (or just use contains_banned, which handles the fallback).
+    """
+    hits: List[int] = []
+
+    def _on_match(pat_id, start, end, flags, context=None):
+        hits.append(pat_id)
+        return 1  # halt the scan on the first hit
+
+    try:
+        HS_DB.scan(text.encode("utf-8", "ignore"), match_event_handler=_on_match)
+    except _hyperscan.ScanTerminated:
+        pass
+    return hits[0] if hits else None
+
+
 # Robust Discord invite matcher: supports discord.gg and discord.com/invite
 # Ignores trailing punctuation like ')' or '.'
 REQUIRED_DISCORD_LINK: Final[Pattern[str]] = re.compile(
@@ -85,11 +234,97 @@ REQUIRED_DISCORD_LINK: Final[Pattern[str]] = re.compile(
 # Load rules from JSON (UTF-8). Log-and-continue if missing or invalid.
 RULES_PATH = Path("./config/subreddit_rules.json")
 try:
-    if RULES_PATH.is_file():
-        with RULES_PATH.open("r", encoding="utf-8") as rules_file:
-            SUBREDDIT_RULES = load(rules_file)
-    else:
-        SUBREDDIT_RULES = {}
+    SUBREDDIT_RULES = _json_loads(RULES_PATH.read_bytes()) if RULES_PATH.is_file() else {}
 except Exception as e:
     # Keep running even if rules fail to load
-    SUBREDDIT_RULES = {}
\ No newline at end of file
+    SUBREDDIT_RULES = {}
+
+
+# Param keys whose values are regex strings (or lists of them) in rules JSON
+_PATTERN_KEYS = ("pattern", "patterns", "regex", "banned_patterns")
+
+
+def _compile_rule_patterns(rules_config: Dict) -> None:
+    """
+    Walks the loaded rules config once, compiling every regex string in place
+    into an re.Pattern and dropping the ones that fail. Rule functions then
+    run pre-compiled patterns on the hot path and never hit re.error there.
+    """
+    def _compile(pattern, sub_name: str, rule_name, flags=re.IGNORECASE):
+        if isinstance(pattern, re.Pattern):
+            return pattern
+        try:
+            return re.compile(pattern, flags)
+        except re.error as e:
+            logger.error(
+                f"Dropping invalid regex for r/{sub_name} rule '{rule_name}': '{pattern}' ({e})"
+            )
+            return None
+
+    for sub_name, cfg in rules_config.get("subreddits", {}).items():
+        for rule in cfg.get("rules", []):
+            rule_name = rule.get("name")
+            params = rule.get("params", {})
+            for key in _PATTERN_KEYS:
+                value = params.get(key)
+                if isinstance(value, list):
+                    compiled = [_compile(p, sub_name, rule_name) for p in value]
+                    kept = [p for p in compiled if p is not None]
+                    params[key] = kept
+                    if kept:
+                        # Fused alternation: rule functions use this as a
+                        # single-pass prescreen before identifying the
+                        # specific matching pattern.
+                        try:
+                            params[f"_{key}_union"] = re.compile(
+                                "|".join(f"(?:{p.pattern.replace('(?i)', '')})" for p in kept),
+                                re.IGNORECASE,
+                            )
+                        except re.error:
+                            pass
+                elif isinstance(value, str):
+                    compiled = _compile(value, sub_name, rule_name)
+                    if compiled is None:
+                        params.pop(key)
+                    else:
+                        params[key] = compiled
+            # Flair lists become lowercase frozensets for O(1) case-insensitive
+            # membership; the original lists are kept for removal-reason text.
+            for key in ("flairs", "allowed_flairs", "denied_flairs"):
+                value = params.get(key)
+                if isinstance(value, list):
+                    params[f"_{key}_lower"] = frozenset(
+                        f.lower() for f in value if isinstance(f, str)
+                    )
+            # Precompute duration params in seconds so rule functions compare
+            # plain floats instead of re-deriving them per submission.
+            min_age_days = params.get("min_account_age_days")
+            if isinstance(min_age_days, (int, float)):
+                params["_min_account_age_s"] = float(min_age_days) * 86400.0
+            window_s = (
+                float(params.get("window_hours", 0) or 0) * 3600.0
+                + float(params.get("window_minutes", 0) or 0) * 60.0
+            )
+            if window_s:
+                params["_window_s"] = window_s
+            title_pattern = params.get("title_pattern")
+            if isinstance(title_pattern, str):
+                compiled = _compile(title_pattern, sub_name, rule_name, flags=0)
+                if compiled is None:
+                    params.pop("title_pattern")
+                else:
+                    params["title_pattern"] = compiled
+            # Static reasons get their footer appended once at load, so the
+            # removal reply is a precomposed string with no hot-path concat.
+            reason = params.get("reason")
+            if isinstance(reason, str):
+                params["_full_message"] = full_message(reason, sub_name)
+
+    # Interned subreddit names: dict lookups keyed on them become pointer
+    # comparisons in the common case.
+    subs = rules_config.get("subreddits")
+    if isinstance(subs, dict):
+        rules_config["subreddits"] = {sys.intern(name): cfg for name, cfg in subs.items()}
+
+
+_compile_rule_patterns(SUBREDDIT_RULES)
\ No newline at end of file
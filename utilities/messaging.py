@@ -1,3 +1,26 @@
+import functools
+
+# Footer template hoisted to module level so the literal is parsed once;
+# per-subreddit renders are memoized below.
+_FOOTER_TMPL = """
+
+---
+
+*I am a bot, and this action was performed automatically. Please [contact the moderators of this subreddit](/message/compose/?to=/r/{subreddit_name}) if you have any questions or concerns.*"""
+
+
+@functools.lru_cache(maxsize=64)
+def _footer(subreddit_name):
+    """Renders (and caches) the bot footer for a subreddit. The subreddit set
+    is small and fixed, so this is effectively a one-time format per sub."""
+    return _FOOTER_TMPL.format(subreddit_name=subreddit_name)
+
+
+def full_message(reason, subreddit_name):
+    """Returns the reason with the cached footer appended. Rules with static
+    reasons precompose this at load time so replies do zero concatenation."""
+    return reason + _footer(subreddit_name)
+
 
 def send_reply_with_footer(submission, reason, subreddit_name):
     """
@@ -7,10 +30,4 @@ def send_reply_with_footer(submission, reason, subreddit_name):
     :param reason: The primary content of the reply message.
     :param subreddit_name: The name of the subreddit, used to build the modmail link.
     """
-    footer = f"""
-
----
-
-*I am a bot, and this action was performed automatically. Please [contact the moderators of this subreddit](/message/compose/?to=/r/{subreddit_name}) if you have any questions or concerns.*"""
-    full_message = reason + footer
-    submission.reply(full_message)
+    submission.reply(full_message(reason, subreddit_name))
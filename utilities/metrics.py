@@ -1,16 +1,28 @@
+import itertools
 import threading
 import time
+from collections import defaultdict
 from typing import Dict, Any
 
 class Metrics:
     """A thread-safe class for tracking application metrics."""
+
+    __slots__ = ("_lock", "_msg_counter", "_msg_reads", "_rule_counters",
+                 "_rule_reads", "_data")
+
     def __init__(self):
         self._lock = threading.Lock()
+        # Plain counters are replaced with itertools.count generators:
+        # next() is atomic under the GIL, so increments never touch the lock.
+        # snapshot() reads a counter by consuming one tick and subtracting
+        # the ticks previous snapshots consumed.
+        self._msg_counter = itertools.count()
+        self._msg_reads = 0
+        self._rule_counters: Dict[str, Any] = defaultdict(itertools.count)
+        self._rule_reads: Dict[str, int] = {}
         self._data: Dict[str, Any] = {
             "start_time": time.time(),
             "subreddits": {},
-            "messages_sent": 0,
-            "rules_triggered": {},
             "last_error": None,
         }
 
@@ -28,14 +40,37 @@ class Metrics:
                 s["last_submission_id"] = last_id
 
     def incr_message(self, count: int = 1) -> None:
-        """Increments the counter for sent messages."""
-        with self._lock:
-            self._data["messages_sent"] += count
+        """Increments the counter for sent messages (lock-free)."""
+        for _ in range(count):
+            next(self._msg_counter)
 
     def incr_rule_trigger(self, rule_name: str, count: int = 1) -> None:
-        """Increments the counter for a triggered moderation rule."""
+        """Increments the counter for a triggered moderation rule (lock-free)."""
+        counter = self._rule_counters[rule_name]
+        for _ in range(count):
+            next(counter)
+
+    def record_event(self, subreddit: str, *, rule: str = None, message: bool = False,
+                     submission_id: str = None) -> None:
+        """
+        Records everything a processed submission produced in one call, so the
+        lock is taken once instead of once per counter.
+        """
         with self._lock:
-            self._data["rules_triggered"][rule_name] = self._data["rules_triggered"].get(rule_name, 0) + count
+            s = self._data["subreddits"].setdefault(subreddit, {
+                "processed": 0,
+                "last_processed_ts": None,
+                "last_submission_id": None,
+            })
+            s["processed"] += 1
+            s["last_processed_ts"] = time.time()
+            if submission_id:
+                s["last_submission_id"] = submission_id
+        # Scalar counters are lock-free (see __init__), so they stay outside.
+        if message:
+            next(self._msg_counter)
+        if rule:
+            next(self._rule_counters[rule])
 
     def set_error(self, msg: str) -> None:
         """Records the last error message."""
@@ -48,7 +83,16 @@ class Metrics:
             snap = dict(self._data)
             # Deep copy mutable structures
             snap["subreddits"] = {k: dict(v) for k, v in self._data["subreddits"].items()}
-            snap["rules_triggered"] = dict(self._data["rules_triggered"])
+            # Reading a count generator consumes one tick; subtract the ticks
+            # spent by this and earlier snapshots to recover the true total.
+            snap["messages_sent"] = next(self._msg_counter) - self._msg_reads
+            self._msg_reads += 1
+            rules: Dict[str, int] = {}
+            for name, counter in list(self._rule_counters.items()):
+                reads = self._rule_reads.get(name, 0)
+                rules[name] = next(counter) - reads
+                self._rule_reads[name] = reads + 1
+            snap["rules_triggered"] = rules
             snap["uptime_seconds"] = time.time() - self._data["start_time"]
             return snap
 
@@ -1,36 +1,53 @@
+import array
 import time
 import logging
-from collections import deque
 from contextlib import contextmanager
-from datetime import datetime
-from threading import Condition, Lock
+from threading import BoundedSemaphore, Condition, Lock, Thread
 from typing import Optional, Dict, Any
 
 # Create logger directly instead of importing from logs
 logger = logging.getLogger(__name__)
-if not logger.handlers:
+# Attach a fallback handler only when the application hasn't configured the
+# root logger; otherwise records would be formatted and emitted twice. When
+# we do attach one, stop propagation so a later root configuration doesn't
+# reintroduce the duplicate.
+if not logger.handlers and not logging.getLogger().hasHandlers():
     handler = logging.StreamHandler()
     formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s')
     handler.setFormatter(formatter)
     logger.addHandler(handler)
     logger.setLevel(logging.INFO)
+    logger.propagate = False
 
 
 @contextmanager
 def log_context(logger_obj, operation_name: str, level: int = logging.INFO):
     """Context manager for logging operation start and end."""
-    logger_obj.log(level, f"Starting: {operation_name}")
-    start_time = datetime.now()
+    logger_obj.log(level, "Starting: %s", operation_name)
+    start_time = time.perf_counter()
 
     try:
         yield
-        duration = (datetime.now() - start_time).total_seconds()
-        logger_obj.log(level, f"Completed: {operation_name} (took {duration:.4f}s)")
+        duration = time.perf_counter() - start_time
+        logger_obj.log(level, "Completed: %s (took %.4fs)", operation_name, duration)
     except Exception as e:
-        duration = (datetime.now() - start_time).total_seconds()
-        logger_obj.error(f"Failed: {operation_name} after {duration:.4f}s - {str(e)}")
+        duration = time.perf_counter() - start_time
+        logger_obj.error("Failed: %s after %.4fs - %s", operation_name, duration, e)
         raise
 
+class _MergingAdapter(logging.LoggerAdapter):
+    """
+    LoggerAdapter that merges per-call `extra` into the bound static fields.
+    The stock adapter silently discards per-call extras, which would lose the
+    dynamic state fields at each log site.
+    """
+
+    def process(self, msg, kwargs):
+        call_extra = kwargs.get("extra")
+        kwargs["extra"] = {**self.extra, **call_extra} if call_extra else self.extra
+        return msg, kwargs
+
+
 class RateLimiter:
     """
     Sliding-window rate limiter with structured, low-noise logging:
@@ -39,6 +56,11 @@ class RateLimiter:
     - Emits debug logs for waits (sampled) and info for configuration changes and notable events.
     """
 
+    __slots__ = ("max_requests", "time_window", "_time_window_ns", "name",
+                 "_ring", "_head", "_cond", "_total_acquired", "_total_denied",
+                 "_total_time_waited", "_debug_counter", "_log_sample_every",
+                 "_extra_cached", "_log")
+
     def __init__(
         self,
         max_requests: int,
@@ -62,8 +84,16 @@ class RateLimiter:
 
         self.max_requests = int(max_requests)
         self.time_window = float(time_window)
+        # Integer nanoseconds keep the hot-path arithmetic in CPython's int
+        # fast path; floats only appear at the logging/API boundary.
+        self._time_window_ns = int(self.time_window * 1e9)
         self.name = name or "default"
-        self._events = deque()  # stores monotonic timestamps of accepted requests
+        # Fixed-size ring of the last `max_requests` acceptance timestamps
+        # (monotonic ns). 0 marks a never-used slot. `_head` indexes the
+        # oldest slot, so the availability check is a single array read with
+        # no per-call pruning or deque churn.
+        self._ring = array.array("q", [0] * self.max_requests)
+        self._head = 0
         self._cond = Condition(Lock())
 
         # Counters/metrics
@@ -73,12 +103,17 @@ class RateLimiter:
         self._debug_counter = 0
         self._log_sample_every = int(log_sample_every)
 
-        logger.info(
-            "ratelimiter_initialized",
-            extra=self._extra_fields()
-        )
+        # name/max/window only change in set_limits, so the static log fields
+        # are bound once to an adapter instead of merged per log call.
+        self._extra_cached: Dict[str, Any] = self._build_extra_fields()
+        self._log = _MergingAdapter(logger, self._extra_cached)
+
+        self._log.info("ratelimiter_initialized")
 
     def _extra_fields(self) -> Dict[str, Any]:
+        return self._extra_cached
+
+    def _build_extra_fields(self) -> Dict[str, Any]:
         return {
             "component": "RateLimiter",
             "limiter_name": self.name,  # renamed from "name" to avoid clobbering LogRecord.name
@@ -88,19 +123,33 @@ class RateLimiter:
 
     def _state_fields(self) -> Dict[str, Any]:
         # Called while holding the condition lock for consistency
+        now = self._now()
+        in_window = self._in_window_count(now)
+        oldest = self._ring[self._head]
         return {
-            "in_window": len(self._events),
-            "utilization": round(len(self._events) / self.max_requests, 3),
-            "oldest_age_s": 0.0 if not self._events else round(self._now() - self._events[0], 6),
+            "in_window": in_window,
+            "utilization": round(in_window / self.max_requests, 3),
+            "oldest_age_s": 0.0 if oldest == 0 else round((now - oldest) / 1e9, 6),
         }
 
-    def _now(self) -> float:
-        return time.monotonic()
+    def _now(self) -> int:
+        return time.monotonic_ns()
 
-    def _prune(self, now: float) -> None:
-        cutoff = now - self.time_window
-        while self._events and self._events[0] <= cutoff:
-            self._events.popleft()
+    def _in_window_count(self, now: int) -> int:
+        # Cold path (stats/utilization only): scan the fixed-size ring.
+        # The hot path never needs this count — only the oldest slot.
+        cutoff = now - self._time_window_ns
+        return sum(1 for ts in self._ring if ts != 0 and ts > cutoff)
+
+    def _slot_free(self, now: int) -> bool:
+        # A slot is free iff the oldest of the last `max_requests` acceptances
+        # is outside the window (or the slot was never used).
+        oldest = self._ring[self._head]
+        return oldest == 0 or now - oldest >= self._time_window_ns
+
+    def _take_slot(self, now: int) -> None:
+        self._ring[self._head] = now
+        self._head = (self._head + 1) % self.max_requests
 
     def next_available_in(self) -> float:
         """
@@ -108,12 +157,35 @@ class RateLimiter:
         """
         with self._cond:
             now = self._now()
-            self._prune(now)
-            if len(self._events) < self.max_requests:
+            if self._slot_free(now):
                 return 0.0
-            oldest = self._events[0]
-            remaining = self.time_window - (now - oldest)
-            return max(0.0, remaining)
+            remaining_ns = self._time_window_ns - (now - self._ring[self._head])
+            return max(0.0, remaining_ns / 1e9)
+
+    def _try_fast(self) -> bool:
+        """
+        Uncontended fast path: take a slot if one is free, with no logging
+        dict construction. ~99% of calls on a healthy bot land here.
+        """
+        with self._cond:
+            now = self._now()
+            if self._slot_free(now):
+                self._take_slot(now)
+                self._total_acquired += 1
+                self._debug_counter += 1
+                # Sampled debug to avoid log storms; the extra dict is only
+                # built when DEBUG is actually enabled.
+                if (self._debug_counter % self._log_sample_every == 0
+                        and logger.isEnabledFor(logging.DEBUG)):
+                    self._log.debug(
+                        "ratelimiter_acquired",
+                        extra={
+                            **self._state_fields(),
+                            "total_acquired": self._total_acquired,
+                        },
+                    )
+                return True
+            return False
 
     def acquire(self, block: bool = True, timeout: Optional[float] = None) -> bool:
         """
@@ -122,31 +194,47 @@ class RateLimiter:
         - If block=True, wait until a slot is available or until `timeout` elapses.
         Returns True if a slot was acquired, False otherwise.
         """
+        if self._try_fast():
+            return True
+
+        if not block:
+            with self._cond:
+                self._total_denied += 1
+                self._debug_counter += 1
+                if (self._debug_counter % self._log_sample_every == 0
+                        and logger.isEnabledFor(logging.DEBUG)):
+                    self._log.debug(
+                        "ratelimiter_denied_nonblocking",
+                        extra={**self._state_fields(), "total_denied": self._total_denied},
+                    )
+            return False
+
+        return self._acquire_blocking(timeout)
+
+    def _acquire_blocking(self, timeout: Optional[float]) -> bool:
+        """Contended slow path: wait for the oldest slot to expire."""
         start_wait = self._now()
-        deadline = None if timeout is None else start_wait + max(0.0, timeout)
+        deadline = None if timeout is None else start_wait + int(max(0.0, timeout) * 1e9)
 
         with self._cond:
             while True:
                 now = self._now()
-                self._prune(now)
 
-                # Fast path: slot available
-                if len(self._events) < self.max_requests:
-                    self._events.append(now)
+                if self._slot_free(now):
+                    self._take_slot(now)
                     self._total_acquired += 1
-                    waited = now - start_wait
+                    waited = (now - start_wait) / 1e9
                     if waited > 0:
                         self._total_time_waited += waited
                     # Notify in case others are waiting on room/metrics
                     self._cond.notify_all()
 
-                    # Sampled debug to avoid log storms
                     self._debug_counter += 1
-                    if self._debug_counter % self._log_sample_every == 0:
-                        logger.debug(
+                    if (self._debug_counter % self._log_sample_every == 0
+                            and logger.isEnabledFor(logging.DEBUG)):
+                        self._log.debug(
                             "ratelimiter_acquired",
                             extra={
-                                **self._extra_fields(),
                                 **self._state_fields(),
                                 "waited_s": round(waited, 6),
                                 "total_acquired": self._total_acquired,
@@ -154,30 +242,18 @@ class RateLimiter:
                         )
                     return True
 
-                # No slot and non-blocking: deny
-                if not block:
-                    self._total_denied += 1
-                    self._debug_counter += 1
-                    if self._debug_counter % self._log_sample_every == 0:
-                        logger.debug(
-                            "ratelimiter_denied_nonblocking",
-                            extra={**self._extra_fields(), **self._state_fields(), "total_denied": self._total_denied},
-                        )
-                    return False
-
-                # Compute time until the next event expires
-                wait_for = self.time_window - (now - self._events[0])
+                # Compute time (seconds) until the oldest slot expires
+                wait_for = (self._time_window_ns - (now - self._ring[self._head])) / 1e9
                 wait_for = max(0.0, wait_for)
 
                 # Apply timeout constraint if any
                 if deadline is not None:
-                    remaining = max(0.0, deadline - now)
+                    remaining = max(0.0, (deadline - now) / 1e9)
                     if remaining <= 0.0:
                         self._total_denied += 1
-                        logger.info(
+                        self._log.info(
                             "ratelimiter_timeout",
                             extra={
-                                **self._extra_fields(),
                                 **self._state_fields(),
                                 "timeout_s": timeout,
                                 "total_denied": self._total_denied,
@@ -189,10 +265,11 @@ class RateLimiter:
                 # Sample a debug log right before waiting if delay is notable or sampled
                 noteworthy = wait_for >= 1.0  # log more readily for longer waits
                 self._debug_counter += 1
-                if noteworthy or (self._debug_counter % self._log_sample_every == 0):
-                    logger.debug(
+                if (noteworthy or self._debug_counter % self._log_sample_every == 0) \
+                        and logger.isEnabledFor(logging.DEBUG):
+                    self._log.debug(
                         "ratelimiter_waiting",
-                        extra={**self._extra_fields(), **self._state_fields(), "wait_for_s": round(wait_for, 6)},
+                        extra={**self._state_fields(), "wait_for_s": round(wait_for, 6)},
                     )
 
                 # Wait releases the lock, avoiding active sleep
@@ -208,16 +285,13 @@ class RateLimiter:
         """
         with self._cond:
             now = self._now()
-            self._prune(now)
-            return min(1.0, len(self._events) / self.max_requests)
+            return min(1.0, self._in_window_count(now) / self.max_requests)
 
     def stats(self) -> Dict[str, Any]:
         """
         Snapshot of limiter statistics.
         """
         with self._cond:
-            now = self._now()
-            self._prune(now)
             return {
                 **self._extra_fields(),
                 **self._state_fields(),
@@ -245,12 +319,18 @@ class RateLimiter:
             old = {"max_requests": self.max_requests, "time_window_s": self.time_window}
             self.max_requests = int(max_requests)
             self.time_window = float(time_window)
-            # Prune to the new window immediately
-            self._prune(self._now())
-
-            logger.info(
+            self._time_window_ns = int(self.time_window * 1e9)
+            self._extra_cached = self._build_extra_fields()
+            self._log.extra = self._extra_cached
+            # Rebuild the ring, keeping the newest `max_requests` timestamps in
+            # chronological order so `_head` again indexes the oldest slot.
+            kept = sorted(ts for ts in self._ring if ts != 0)[-self.max_requests:]
+            self._ring = array.array("q", kept + [0] * (self.max_requests - len(kept)))
+            self._head = len(kept) % self.max_requests
+
+            self._log.info(
                 "ratelimiter_reconfigured",
-                extra={**self._extra_fields(), "old": old, **self._state_fields()},
+                extra={"old": old, **self._state_fields()},
             )
             # Wake any waiters so they can recompute wait times
             self._cond.notify_all()
@@ -272,5 +352,140 @@ class RateLimiter:
         )
 
 
-# Example: 100 requests per 60 seconds
-RATE_LIMITER = RateLimiter(max_requests=100, time_window=60.0)
\ No newline at end of file
+class TokenBucketLimiter:
+    """
+    Token-bucket limiter with the same call surface as RateLimiter.
+
+    A single daemon thread releases one semaphore token every
+    `time_window / max_requests` seconds, so under contention each refill
+    wakes exactly one waiter — no Condition notify_all thundering herd and
+    no per-call window bookkeeping. Better suited to bursty multi-threaded
+    callers than the sliding-window RateLimiter, at the cost of slightly
+    smoother (token-per-interval) admission.
+    """
+
+    __slots__ = ("max_requests", "time_window", "name", "_refill_interval",
+                 "_sem", "_approx_tokens", "_last_refill", "_total_acquired",
+                 "_total_denied", "_refill_thread")
+
+    def __init__(
+        self,
+        max_requests: int,
+        time_window: float,
+        *,
+        name: Optional[str] = None,
+    ):
+        if max_requests <= 0:
+            raise ValueError("max_requests must be >= 1")
+        if time_window <= 0:
+            raise ValueError("time_window must be > 0")
+
+        self.max_requests = int(max_requests)
+        self.time_window = float(time_window)
+        self.name = name or "default"
+        self._refill_interval = self.time_window / self.max_requests
+        self._sem = BoundedSemaphore(self.max_requests)
+
+        # Approximate token count for stats/next_available_in only; the
+        # semaphore itself is the source of truth for admission.
+        self._approx_tokens = self.max_requests
+        self._last_refill = time.monotonic()
+        self._total_acquired = 0
+        self._total_denied = 0
+
+        self._refill_thread = Thread(
+            target=self._refill_loop,
+            name=f"ratelimit-refill-{self.name}",
+            daemon=True,
+        )
+        self._refill_thread.start()
+
+        logger.info("tokenbucket_initialized", extra=self._extra_fields())
+
+    def _extra_fields(self) -> Dict[str, Any]:
+        return {
+            "component": "TokenBucketLimiter",
+            "limiter_name": self.name,
+            "max_requests": self.max_requests,
+            "time_window_s": self.time_window,
+        }
+
+    def _refill_loop(self) -> None:
+        while True:
+            time.sleep(self._refill_interval)
+            self._last_refill = time.monotonic()
+            try:
+                self._sem.release()
+                self._approx_tokens = min(self.max_requests, self._approx_tokens + 1)
+            except ValueError:
+                # Bucket already full
+                self._approx_tokens = self.max_requests
+
+    def acquire(self, block: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        Consume one token. Mirrors RateLimiter.acquire semantics:
+        non-blocking returns immediately; blocking waits for a refill or
+        until `timeout` elapses.
+        """
+        if timeout is not None:
+            ok = self._sem.acquire(True, max(0.0, timeout))
+        else:
+            ok = self._sem.acquire(block)
+        if ok:
+            self._total_acquired += 1
+            self._approx_tokens = max(0, self._approx_tokens - 1)
+        else:
+            self._total_denied += 1
+        return ok
+
+    def try_acquire(self) -> bool:
+        """Non-blocking acquire."""
+        return self.acquire(block=False)
+
+    def next_available_in(self) -> float:
+        """
+        Returns an estimate of seconds until the next token (0 if one is
+        likely available now).
+        """
+        if self._approx_tokens > 0:
+            return 0.0
+        elapsed = time.monotonic() - self._last_refill
+        return max(0.0, self._refill_interval - elapsed)
+
+    def utilization(self) -> float:
+        """Fraction of the bucket currently consumed, in [0, 1]."""
+        return min(1.0, max(0.0, 1.0 - self._approx_tokens / self.max_requests))
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of limiter statistics."""
+        return {
+            **self._extra_fields(),
+            "tokens_approx": self._approx_tokens,
+            "utilization": round(self.utilization(), 3),
+            "total_acquired": self._total_acquired,
+            "total_denied": self._total_denied,
+        }
+
+    def log_stats(self, level: int = logging.INFO) -> None:
+        """Emit a one-shot structured log with current stats."""
+        logger.log(level, "tokenbucket_stats", extra=self.stats())
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Tokens are replenished by the refill thread, not released by callers.
+        return False
+
+    def __repr__(self) -> str:
+        return (
+            f"TokenBucketLimiter(name={self.name!r}, max_requests={self.max_requests}, "
+            f"time_window={self.time_window}, tokens~{self._approx_tokens})"
+        )
+
+
+# Example: 100 requests per 60 seconds. The token bucket wakes one waiter per
+# refill; the sliding-window RateLimiter above remains available for callers
+# that need exact windowed semantics.
+RATE_LIMITER = TokenBucketLimiter(max_requests=100, time_window=60.0)
\ No newline at end of file
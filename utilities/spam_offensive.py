@@ -1,54 +1,161 @@
+import bisect
+import functools
 import logging
 import re
+import time
+from collections import deque
 from contextlib import contextmanager
-from datetime import datetime, timedelta
-from typing import Optional, Sequence, Tuple, List, Dict
+from datetime import datetime
+from itertools import islice
+from typing import Optional, List
 
 from better_profanity import profanity
 
-from utilities.globals import chicago_tz, recent_posts
+from utilities.globals import (
+    PROFANITY_AUTOMATON,
+    PROFANITY_VARIANTS,
+    is_actually_offensive_fast,
+    recent_posts,
+    recent_posts_key,
+)
 from utilities.words import soft_curse_words
 # Create logger directly instead of importing from logs
 logger = logging.getLogger(__name__)
-if not logger.handlers:
+# Attach a fallback handler only when the application hasn't configured the
+# root logger; otherwise records would be formatted and emitted twice. When
+# we do attach one, stop propagation so a later root configuration doesn't
+# reintroduce the duplicate.
+if not logger.handlers and not logging.getLogger().hasHandlers():
     handler = logging.StreamHandler()
     formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s')
     handler.setFormatter(formatter)
     logger.addHandler(handler)
     logger.setLevel(logging.INFO)
+    logger.propagate = False
 
 
 @contextmanager
 def log_context(logger_obj, operation_name: str, level: int = logging.INFO):
     """Context manager for logging operation start and end."""
-    logger_obj.log(level, f"Starting: {operation_name}")
-    start_time = datetime.now()
+    logger_obj.log(level, "Starting: %s", operation_name)
+    start_time = time.perf_counter()
 
     try:
         yield
-        duration = (datetime.now() - start_time).total_seconds()
-        logger_obj.log(level, f"Completed: {operation_name} (took {duration:.4f}s)")
+        duration = time.perf_counter() - start_time
+        logger_obj.log(level, "Completed: %s (took %.4fs)", operation_name, duration)
     except Exception as e:
-        duration = (datetime.now() - start_time).total_seconds()
-        logger_obj.error(f"Failed: {operation_name} after {duration:.4f}s - {str(e)}")
+        duration = time.perf_counter() - start_time
+        logger_obj.error("Failed: %s after %.4fs - %s", operation_name, duration, e)
         raise
-# Convert to a set once for O(1) membership checks
-_SOFT_CURSE_WORDS_SET = set(soft_curse_words)
+# Frozen lowercase set for O(1) membership checks. Tokens are compared after
+# lowering, so entries are normalized here — producers of soft_curse_words
+# don't need to pre-normalize case.
+_SOFT_CURSE_WORDS_SET = frozenset(w.lower() for w in soft_curse_words)
+
+
+class _TrieNode:
+    """Node of the profanity trie: children per character plus an end marker."""
+
+    __slots__ = ("children", "is_end")
+
+    def __init__(self):
+        self.children = {}
+        self.is_end = False
+
+
+def _build_profanity_trie():
+    """
+    Builds a character trie over the canonical censor words once at import.
+    Token checks then walk the trie instead of calling back into
+    better_profanity (which regenerates substitution variants per call).
+    Returns None when the word list is unavailable.
+    """
+    root = _TrieNode()
+    try:
+        for entry in profanity.CENSOR_WORDSET:
+            word = str(entry).lower()
+            if not word:
+                continue
+            node = root
+            for ch in word:
+                node = node.children.setdefault(ch, _TrieNode())
+            node.is_end = True
+    except Exception:
+        return None
+    return root if root.children else None
+
+
+_PROFANITY_TRIE = _build_profanity_trie()
+
+
+# Censor words including the pre-expanded character-substitution variants
+# (built once in globals). Flagging a batch of tokens is one C-level set
+# intersection, and variant spellings like "b1tch" or "a55" hit exactly as
+# they would through better_profanity's per-call matching. Empty when the
+# word list is unavailable.
+_CENSOR_WORDS = PROFANITY_VARIANTS
+
+# Shortest censor-list entry: text shorter than this cannot contain any
+# profanity, so the scan is skipped outright (0 disables the shortcut when
+# the word list is unavailable).
+_MIN_PROF_LEN = min(map(len, _CENSOR_WORDS), default=0)
+
+
+def _trie_has_word(word: str) -> bool:
+    """True if `word` exactly matches a canonical censor-list entry."""
+    node = _PROFANITY_TRIE
+    for ch in word:
+        node = node.children.get(ch)
+        if node is None:
+            return False
+    return node.is_end
 
 # Tokenizer that keeps simple word tokens and apostrophes (e.g., don't, it's)
 _WORD_RE = re.compile(r"\b[\w']+\b")
 
+# ASCII fast path: map every byte that can't appear in a word token to a
+# space, then split. Input is already lowercased, so only lowercase letters,
+# digits, underscore and apostrophe survive. One C-level translate+split
+# replaces a backtracking regex scan for the overwhelmingly ASCII Reddit
+# corpus; non-ASCII text keeps the regex (\w covers Unicode word chars).
+_TOKEN_TBL = str.maketrans(
+    {i: " " for i in range(128) if chr(i) not in "abcdefghijklmnopqrstuvwxyz0123456789_'"}
+)
+
+
+def _tokenize(lowered: str) -> List[str]:
+    """Splits normalized text into word tokens (translate+split for ASCII,
+    regex otherwise)."""
+    if lowered.isascii():
+        return lowered.translate(_TOKEN_TBL).split()
+    return _WORD_RE.findall(lowered)
+
+
+def _as_ts(t) -> float:
+    """Normalizes a recent_posts entry to epoch seconds. Entries written by
+    the current producer are already floats; datetimes may linger from older
+    deployments or test fixtures."""
+    return t if isinstance(t, float) else t.timestamp()
+
+
+# Star runs precomputed by length; indexing skips a '*' * n allocation per
+# mask. 64 covers any realistic token; longer ones fall back to multiplication.
+_STARS = tuple("*" * i for i in range(64))
+
 
 def _mask_word(w: str) -> str:
     """
     Mask a word to avoid logging offensive terms in plaintext.
     Keeps first/last character when possible, masks the middle.
     """
-    if not w:
+    n = len(w)
+    if n == 0:
         return ""
-    if len(w) <= 2:
-        return "*" * len(w)
-    return f"{w[0]}{'*' * (len(w) - 2)}{w[-1]}"
+    if n <= 2:
+        return _STARS[n]
+    middle = _STARS[n - 2] if n < 66 else "*" * (n - 2)
+    return f"{w[0]}{middle}{w[-1]}"
 
 
 def is_spamming(
@@ -64,7 +171,8 @@ def is_spamming(
     Return True if the user has posted at least `max_posts` items within the given window.
 
     Notes:
-    - Uses timezone-aware timestamps based on `chicago_tz`.
+    - Uses epoch-second timestamps (time.time()); an injected `now` datetime
+      is converted once via .timestamp().
     - The comparison is "at least" (>=) rather than "exceeds" to match typical rate-limit semantics.
     - Accepts an optional `now` for testability.
     """
@@ -113,15 +221,17 @@ def is_spamming(
         window_hours = max(0, window_hours)
         window_minutes = max(0, window_minutes)
 
-    # Allow injecting time for deterministic tests
-    _now = now or datetime.now(chicago_tz)
-    window_start = _now - timedelta(hours=window_hours, minutes=window_minutes)
+    # Allow injecting time for deterministic tests. time.time() already
+    # yields epoch seconds, so no tz-aware datetime is built on the hot path;
+    # the result log reports plain epoch floats.
+    now_ts = now.timestamp() if now else time.time()
+    cutoff = now_ts - (window_hours * 3600 + window_minutes * 60)
 
     # Retrieve and filter posts in the given window.
     # Key is (author, subreddit_name) to support per-subreddit rate limits.
     # If your system also needs global-per-author limits, consider checking (author, None) separately.
     try:
-        user_posts: Sequence[datetime] = recent_posts.get((author, subreddit_name), [])
+        user_posts = recent_posts.get(recent_posts_key(author, subreddit_name), ())
     except Exception as e:
         logger.exception(
             "is_spamming_recent_posts_error",
@@ -133,31 +243,50 @@ def is_spamming(
                 "error": str(e),
             },
         )
-        user_posts = []
-
-    # Keep only timestamps strictly inside the time window
-    user_posts_in_window = [t for t in user_posts if t > window_start]
-
-    posts_in_window = len(user_posts_in_window)
+        user_posts = ()
+
+    known_posts_total = len(user_posts)
+    if isinstance(user_posts, deque):
+        # Timestamps are appended in order, so expired entries can be evicted
+        # from the left in amortized O(1); what remains is the in-window count.
+        # Two workers can race on the same author's deque, so the emptiness
+        # check and the pop are not atomic together; if another worker drains
+        # the last expired entry between them, just stop evicting — the deque
+        # is merely shorter, which only helps the count.
+        popleft = user_posts.popleft
+        try:
+            while user_posts and _as_ts(user_posts[0]) <= cutoff:
+                popleft()
+        except IndexError:
+            pass
+        posts_in_window = len(user_posts)
+    elif user_posts and isinstance(user_posts[0], float):
+        # Legacy list/tuple of epoch floats: producers append in time order,
+        # so a C-level binary search finds the first in-window index.
+        posts_in_window = len(user_posts) - bisect.bisect_right(user_posts, cutoff)
+    else:
+        # Mixed/datetime legacy storage: linear scan with normalization
+        posts_in_window = sum(1 for t in user_posts if _as_ts(t) > cutoff)
     is_spam = posts_in_window >= max_posts
 
-    logger.info(
-        "is_spamming_result",
-        extra={
-            "component": "spam_offensive",
-            "func": "is_spamming",
-            "author": author,
-            "subreddit": subreddit_name,
-            "max_posts": max_posts,
-            "window_hours": window_hours,
-            "window_minutes": window_minutes,
-            "window_start": window_start.isoformat(),
-            "window_end": _now.isoformat(),
-            "known_posts_total": len(user_posts),
-            "posts_in_window": posts_in_window,
-            "result": is_spam,
-        },
-    )
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "is_spamming_result",
+            extra={
+                "component": "spam_offensive",
+                "func": "is_spamming",
+                "author": author,
+                "subreddit": subreddit_name,
+                "max_posts": max_posts,
+                "window_hours": window_hours,
+                "window_minutes": window_minutes,
+                "window_start_ts": cutoff,
+                "window_end_ts": now_ts,
+                "known_posts_total": known_posts_total,
+                "posts_in_window": posts_in_window,
+                "result": is_spam,
+            },
+        )
 
     return is_spam
 
@@ -170,26 +299,56 @@ def is_actually_offensive(text: Optional[str]) -> bool:
     - If all flagged words are from a configured "soft" set, return False (allow).
     - If any flagged word is not soft, return True (block).
     - Avoids logging raw offensive terms; logs masked examples and counts instead.
+
+    This wrapper only normalizes; the scan itself is memoized in
+    _offensive_impl, keyed on the normalized text so case/whitespace
+    variants of the same content share one cache entry.
     """
     if text is None:
-        logger.debug(
-            "offensive_check_empty_text",
-            extra={"component": "spam_offensive", "func": "is_actually_offensive", "reason": "none"},
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "offensive_check_empty_text",
+                extra={"component": "spam_offensive", "func": "is_actually_offensive", "reason": "none"},
+            )
         return False
 
-    # Normalize whitespace and case
-    lowered = text.strip().lower()
+    # Normalize whitespace and case; strip only when there is edge
+    # whitespace, saving one O(n) string copy for already-clean input.
+    lowered = text.lower()
+    if lowered and (lowered[0].isspace() or lowered[-1].isspace()):
+        lowered = lowered.strip()
     if not lowered:
-        logger.debug(
-            "offensive_check_empty_text",
-            extra={"component": "spam_offensive", "func": "is_actually_offensive", "reason": "blank"},
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "offensive_check_empty_text",
+                extra={"component": "spam_offensive", "func": "is_actually_offensive", "reason": "blank"},
+            )
+        return False
+
+    # Too short to contain even the shortest dictionary word: skip the
+    # tokenize + scan pipeline entirely (covers one/two-char comments).
+    if len(lowered) < _MIN_PROF_LEN:
         return False
 
-    # Fast path: no profanity at all
+    return _offensive_impl(lowered)
+
+
+@functools.lru_cache(maxsize=4096)
+def _offensive_impl(lowered: str) -> bool:
+    """
+    Cached scan over already-normalized text. Titles and copy-paste spam
+    repeat heavily, so repeats resolve to one dict lookup here; the result
+    log fires on the first evaluation only, which keeps cache hits silent
+    by design.
+    """
+    # Fast path: no profanity at all. Prefer the Aho-Corasick automaton
+    # (one linear pass) when available; substring false positives it may
+    # produce are filtered out by the per-word confirmation below.
     try:
-        contains_any = profanity.contains_profanity(lowered)
+        if PROFANITY_AUTOMATON is not None:
+            contains_any = is_actually_offensive_fast(lowered)
+        else:
+            contains_any = profanity.contains_profanity(lowered)
     except Exception as e:
         # Be conservative on library errors: do not block
         logger.exception(
@@ -199,29 +358,64 @@ def is_actually_offensive(text: Optional[str]) -> bool:
         return False
 
     if not contains_any:
-        logger.debug(
-            "offensive_check_no_profanity",
-            extra={
-                "component": "spam_offensive",
-                "func": "is_actually_offensive",
-                "length": len(lowered),
-                "words": len(_WORD_RE.findall(lowered)),
-            },
-        )
+        # Tokenize only to fill the debug field; on the common clean-text
+        # path with DEBUG off, the text is never tokenized at all.
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "offensive_check_no_profanity",
+                extra={
+                    "component": "spam_offensive",
+                    "func": "is_actually_offensive",
+                    "length": len(lowered),
+                    "words": len(_tokenize(lowered)),
+                },
+            )
         return False
 
-    # Tokenize once; use a set to avoid repeated checks for duplicates
-    words = set(_WORD_RE.findall(lowered))
+    # Use a set to avoid repeated checks for duplicate tokens
+    words = set(_tokenize(lowered))
     if not words:
-        logger.debug(
-            "offensive_check_no_tokens",
-            extra={"component": "spam_offensive", "func": "is_actually_offensive", "length": len(lowered)},
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "offensive_check_no_tokens",
+                extra={"component": "spam_offensive", "func": "is_actually_offensive", "length": len(lowered)},
+            )
         return False
 
-    # Identify flagged words; using a set reduces redundant library calls
+    def _is_flagged(w: str) -> bool:
+        # One trie walk per unique token; library fallback only when the
+        # trie could not be built.
+        if _PROFANITY_TRIE is not None:
+            return _trie_has_word(w)
+        return profanity.contains_profanity(w)
+
+    # Hot decision path: when INFO logging is off nobody sees the soft/hard
+    # breakdown, so decide with two C-level set operations (flagged words
+    # that aren't all soft); the per-token loop remains only as the
+    # fallback when the censor set could not be built.
+    if not logger.isEnabledFor(logging.INFO):
+        try:
+            if _CENSOR_WORDS:
+                return not (words & _CENSOR_WORDS) <= _SOFT_CURSE_WORDS_SET
+            # Fallback loop: bind the hot globals once so each iteration
+            # does LOAD_FAST instead of module-dict lookups.
+            is_flagged, soft_set = _is_flagged, _SOFT_CURSE_WORDS_SET
+            return any(is_flagged(w) and w not in soft_set for w in words)
+        except Exception as e:
+            logger.exception(
+                "offensive_check_flagging_error",
+                extra={"component": "spam_offensive", "func": "is_actually_offensive", "error": str(e)},
+            )
+            return False
+
+    # Detailed path: build the full partition to log masked samples/counts.
+    # One set intersection flags the whole batch; the trie/library loop is
+    # only the fallback when the censor set could not be built.
     try:
-        flagged = {w for w in words if profanity.contains_profanity(w)}
+        if _CENSOR_WORDS:
+            flagged = words & _CENSOR_WORDS
+        else:
+            flagged = {w for w in words if _is_flagged(w)}
     except Exception as e:
         logger.exception(
             "offensive_check_flagging_error",
@@ -243,18 +437,24 @@ def is_actually_offensive(text: Optional[str]) -> bool:
         )
         return False
 
-    # Split into soft and hard/unknown
-    soft = {w for w in flagged if w in _SOFT_CURSE_WORDS_SET}
+    # Split into soft and hard/unknown with set operators: the partition
+    # runs inside CPython's C set implementation with no per-token bytecode.
+    soft = flagged & _SOFT_CURSE_WORDS_SET
     hard = flagged - soft
 
     result = len(hard) > 0
 
-    # Prepare masked examples for logging
-    sample_soft = [_mask_word(w) for w in list(soft)[:3]]
-    sample_hard = [_mask_word(w) for w in list(hard)[:3]]
+    level = logging.INFO if result else logging.DEBUG
+    if not logger.isEnabledFor(level):
+        return result
+
+    # Prepare masked examples for logging; islice takes the first three
+    # without materializing the full sets as lists first.
+    sample_soft = [_mask_word(w) for w in islice(soft, 3)]
+    sample_hard = [_mask_word(w) for w in islice(hard, 3)]
 
     logger.log(
-        level=(20 if result else 10),  # INFO if actually offensive, else DEBUG
+        level=level,  # INFO if actually offensive, else DEBUG
         msg="offensive_check_result",
         extra={
             "component": "spam_offensive",